@@ -1,4 +1,45 @@
 from django.contrib import admin
-from .models import Task
+from django.db import transaction
+from .caching import invalidate_dashboard
+from .models import RecurringTask, Task, TaskStats
+from .sync import record_tombstones
 # Register your models here.
-admin.site.register(Task)
\ No newline at end of file
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    # post_delete updates the counters (see signals.py)
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            record_tombstones(Task.objects.filter(pk=obj.pk))
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            record_tombstones(queryset)
+            super().delete_queryset(request, queryset)
+
+
+@admin.register(RecurringTask)
+class RecurringTaskAdmin(admin.ModelAdmin):
+    list_display = ('title', 'user', 'frequency', 'interval', 'starts_at', 'ends_at')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_dashboard(obj.user_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_dashboard(obj.user_id)
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            invalidate_dashboard(user_id)
+
+
+@admin.register(TaskStats)
+class TaskStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total', 'completed', 'pending', 'overdue')
+    readonly_fields = ('total', 'completed', 'pending', 'overdue')
@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class TodoAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'todo_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .db import configure_sqlite
+        from .metrics import install_query_recorder
+        from .search import ensure_search_triggers
+
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(install_query_recorder)
+        post_migrate.connect(ensure_search_triggers, sender=self)
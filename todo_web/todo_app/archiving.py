@@ -0,0 +1,60 @@
+"""
+Moving old completed tasks from the task table to ArchivedTask.
+
+Each batch is one short transaction: an ``INSERT ... SELECT`` copies the rows
+into the archive, tombstones are left for sync clients and a DELETE removes
+the same rows from the task table.
+Because the copy is the transaction's first statement, the write lock is
+taken before anything is read, so the DELETE sees exactly the rows that were
+copied, and the lock is held for one batch only. Candidate ids are picked
+outside the transaction through the (status, expire_at) index.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .caching import invalidate_dashboard
+from .models import ArchivedTask, Task
+from .stats import record_deleted
+from .sync import record_tombstones
+
+COPIED_FIELDS = ('id', 'title', 'description', 'created_at', 'expire_at', 'status', 'user_id')
+
+
+def _copy_sql(batch_size):
+    columns = ', '.join(connection.ops.quote_name(Task._meta.get_field(name).column) for name in COPIED_FIELDS)
+    archive_columns = columns + ', ' + connection.ops.quote_name('archived_at')
+    placeholders = ', '.join(['%s'] * batch_size)
+    return (f"INSERT INTO {connection.ops.quote_name(ArchivedTask._meta.db_table)} ({archive_columns}) "
+            f"SELECT {columns}, %s FROM {connection.ops.quote_name(Task._meta.db_table)} "
+            f"WHERE id IN ({placeholders}) AND status = %s")
+
+
+def archive_completed_tasks(older_than, batch_size=None, now=None):
+    """Archive completed tasks due more than ``older_than`` (a timedelta) ago. Returns the number moved."""
+    batch_size = batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', 1000)
+    now = now or timezone.now()
+    cutoff = now - older_than
+    completed = Task.Status.COMPLETED
+    moved = 0
+    while True:
+        ids = list(Task.objects
+                   .filter(status=completed, expire_at__lt=cutoff)
+                   .order_by('expire_at')
+                   .values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return moved
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(_copy_sql(len(ids)), [now, *ids, completed])
+            archived = Task.objects.filter(id__in=ids, status=completed)
+            # archived tasks leave the task list, so sync clients must drop them too
+            record_tombstones(archived, deleted_at=now)
+            per_user = dict(archived.values_list('user_id').annotate(rows=Count('id')).order_by())
+            archived.delete_rows()
+            for user_id, rows in per_user.items():
+                record_deleted(user_id, {completed: rows})
+        moved += sum(per_user.values())
+        for user_id in per_user:
+            invalidate_dashboard(user_id)
@@ -0,0 +1,27 @@
+"""
+The URLs of urls.py, with the async views swapped in where async_views has one.
+
+Served under ASGI; see todo_web/asgi_urls.py.
+"""
+from django.urls import path
+
+from . import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    'signup': async_views.signup_user,
+    'login': async_views.login_user,
+    'dashboard': async_views.dashboard,
+    'schedule_task': async_views.schedule_task,
+    'task': async_views.user_task,
+    'update_task': async_views.update_task,
+    'mark_task': async_views.mark_complete,
+    'delete_task': async_views.delete_task,
+    'task_events': async_views.task_events,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
@@ -0,0 +1,233 @@
+"""
+Async versions of the dashboard, login/signup and task CRUD views, and the
+live task event stream, which is only served under ASGI.
+
+todo_web/asgi.py serves these (through todo_web/asgi_urls.py) in place of
+their counterparts in views.py, which they mirror behaviour for behaviour.
+Reads use the async ORM and cache APIs; password hashing runs on the bounded
+pool in auth_pool; writes that need a transaction or send signals (counters,
+cache invalidation, events) run in one sync_to_async call each.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth import authenticate, login
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.utils import timezone
+
+from . import stats
+from .auth_pool import run_in_auth_pool
+from .caching import aget_dashboard_marker, aget_dashboard_page, get_dashboard_summary, get_upcoming_occurrences, \
+    invalidate_dashboard
+from .conditional import add_validators, not_modified, page_etag, task_validators
+from .events import event_stream, publish_task_event
+from .filtering import parse_filters, parse_sort
+from .forms import ScheduleTaskForm, SignUpForm
+from .models import Task
+from .pagination import InvalidCursor
+from .recurrence import upcoming_window
+from .throttling import aclear_login_failures, alogin_retry_after, arecord_login_failure
+from .views import MARKABLE_STATUSES, dashboard_list_query, login_throttled
+
+
+async def get_user(request):
+    """Resolve request.user (session and user lookups) off the event loop."""
+    return await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+
+
+def login_required_redirect(request):
+    messages.success(request, "You must be logged in to view this page!")
+    return redirect('login')
+
+
+async def dashboard(request):
+    user = await get_user(request)
+    if user is None:
+        return login_required_redirect(request)
+    try:
+        filters = parse_filters(request.GET)
+        ordering = parse_sort(request.GET.get('sort'))
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    # read before the page, so a write racing the render changes the next ETag
+    modified = await aget_dashboard_marker(user.pk)
+    # the recurring occurrences listed also change at midnight
+    today = timezone.localdate()
+    # and an overdue filter's results every minute (see filtering.py)
+    cutoff = filters.get('overdue')
+    etag = page_etag(request, user.pk, modified, today, cutoff)
+    modified = max(modified, upcoming_window(today)[0].timestamp(), cutoff.timestamp() if cutoff else 0)
+    unchanged = not_modified(request, etag, modified)
+    if unchanged is not None:
+        return unchanged
+    try:
+        page = await aget_dashboard_page(user, filters,
+                                         after=request.GET.get('after'),
+                                         before=request.GET.get('before'),
+                                         page_size=request.GET.get('page_size'),
+                                         ordering=ordering)
+    except InvalidCursor:
+        return redirect('dashboard')
+    summary = await sync_to_async(get_dashboard_summary)(user)
+    upcoming = await sync_to_async(get_upcoming_occurrences)(user, today)
+    response = render(request, 'dashboard.html', {'tasks': page.items, 'page': page, 'summary': summary,
+                                                  'upcoming': upcoming, 'live_events': True,
+                                                  'filtered': bool(filters),
+                                                  'list_query': dashboard_list_query(request.GET)})
+    return add_validators(response, etag, modified)
+
+
+async def login_user(request):
+    if await get_user(request) is not None:
+        messages.success(request, "You are already logged in")
+        return redirect('dashboard')
+    if request.method != 'POST':
+        return render(request, 'login.html', {})
+    username = request.POST['username']
+    retry_after = await alogin_retry_after(request, username)
+    if retry_after:
+        return login_throttled(request, retry_after)
+    user = await run_in_auth_pool(authenticate, request, username=username, password=request.POST['password'])
+    if user is None:
+        await arecord_login_failure(request, username)
+        messages.success(request, "Error logging in. Please try again")
+        return redirect('login')
+    await aclear_login_failures(request, username)
+    await sync_to_async(login)(request, user)
+    messages.success(request, "You have been logged in!")
+    return redirect('dashboard')
+
+
+async def signup_user(request):
+    if await get_user(request) is not None:
+        messages.success(request, "Cannot signup while logged in.")
+        return redirect('dashboard')
+    if request.method != 'POST':
+        return render(request, 'signup.html', {'form': SignUpForm()})
+    form = SignUpForm(request.POST)
+    # validation looks the username up
+    if not await sync_to_async(form.is_valid)():
+        return render(request, 'signup.html', {'form': form})
+    await run_in_auth_pool(form.save)
+    user = await run_in_auth_pool(authenticate, username=form.cleaned_data['username'],
+                                  password=form.cleaned_data['password1'])
+    await sync_to_async(login)(request, user)
+    messages.success(request, "You have successfully registered.")
+    return redirect('dashboard')
+
+
+async def schedule_task(request):
+    user = await get_user(request)
+    if user is None:
+        return login_required_redirect(request)
+    form = ScheduleTaskForm(request.POST or None)
+    if request.method == "POST" and form.is_valid():
+        add_task = Task(
+            title=form.cleaned_data['title'],
+            description=form.cleaned_data['description'],
+            expire_at=form.cleaned_data['expire_at'],
+            remind_before=form.cleaned_data['remind_before'],
+            user_id=user
+        )
+        await add_task.asave()
+        await sync_to_async(publish_task_event)(user.pk, 'created', task=add_task)
+        messages.success(request, "Task scheduled")
+        return redirect('dashboard')
+    return render(request, 'schedule.html', {'form': form})
+
+
+async def user_task(request, pk):
+    user = await get_user(request)
+    if user is None:
+        return login_required_redirect(request)
+    try:
+        task = await Task.objects.for_user(user).aget(id=pk)
+    except ObjectDoesNotExist:
+        messages.error(request, "Task not found.")
+        return redirect('dashboard')
+    etag, modified = task_validators(request, user.pk, task)
+    return (not_modified(request, etag, modified)
+            or add_validators(render(request, 'task.html', {'task': task}), etag, modified))
+
+
+async def update_task(request, pk):
+    user = await get_user(request)
+    if user is None:
+        return login_required_redirect(request)
+    try:
+        task = await Task.objects.for_user(user).aget(id=pk)
+    except ObjectDoesNotExist:
+        raise Http404("Task not found")
+    if request.method == 'POST':
+        form = ScheduleTaskForm(request.POST, instance=task)
+        if form.is_valid():
+            task = form.save(commit=False)
+            if task.status == Task.Status.OVERDUE and task.expire_at > timezone.now():
+                task.status = Task.Status.NOT_COMPLETED
+            await task.asave()
+            await sync_to_async(publish_task_event)(user.pk, 'updated', task=task)
+            messages.success(request, "Task updated successfully!")
+            return redirect('task', pk=pk)
+    else:
+        form = ScheduleTaskForm(instance=task)
+    return render(request, 'update_task.html', {'form': form, 'task': task})
+
+
+def _set_status(user, tasks, new_status):
+    if not stats.set_status(tasks, user.pk, new_status) and not tasks.exists():
+        return None
+    invalidate_dashboard(user.pk)
+    task = tasks.get()
+    publish_task_event(user.pk, 'completed' if new_status == Task.Status.COMPLETED else 'updated', task=task)
+    return task
+
+
+async def mark_complete(request, pk):
+    user = await get_user(request)
+    if user is None:
+        return login_required_redirect(request)
+    if request.method != "POST":
+        return render(request, 'task.html', {})
+    try:
+        new_status = Task.Status.parse(request.POST.get("new_status"))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid status")
+    if new_status not in MARKABLE_STATUSES:
+        return HttpResponseBadRequest("Tasks can only be marked completed or not completed")
+    task = await sync_to_async(_set_status)(user, Task.objects.for_user(user).filter(id=pk), new_status)
+    if task is None:
+        messages.error(request, "Task not found.")
+        raise Http404("Task not found")
+    messages.success(request, "Task status updated!")
+    return render(request, 'task.html', {'task': task})
+
+
+def _delete_task(user, pk):
+    deleted = stats.delete_tasks(Task.objects.for_user(user).filter(id=pk), user.pk)
+    if deleted:
+        invalidate_dashboard(user.pk)
+        publish_task_event(user.pk, 'deleted', ids=[pk])
+    return deleted
+
+
+async def delete_task(request, pk):
+    user = await get_user(request)
+    if user is None:
+        return login_required_redirect(request)
+    if await sync_to_async(_delete_task)(user, pk):
+        messages.success(request, "Task deleted successfully!")
+    else:
+        messages.error(request, "Task not found.")
+    return redirect('dashboard')
+
+
+async def task_events(request):
+    user = await get_user(request)
+    if user is None:
+        return HttpResponseForbidden()
+    response = StreamingHttpResponse(event_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,44 @@
+"""
+A bounded thread pool for password hashing in async views.
+
+A login or signup spends most of its time in PBKDF2. Async views hand
+authenticate() and password-setting saves to this pool of AUTH_POOL_SIZE
+threads, so a burst of logins queues here instead of occupying the threads
+and CPU every other request needs. Functions run with the caller's context
+variables (metrics, replica routing) and, like a request, close stale
+database connections before and after.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'AUTH_POOL_SIZE', 2),
+                                           thread_name_prefix='todo-auth')
+        return _executor
+
+
+def _call(func, args, kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_auth_pool(func, *args, **kwargs):
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, _call, func, args, kwargs)
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), call)
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps the authenticated user in the cache for
+    AUTH_USER_CACHE_TIMEOUT seconds, so AuthenticationMiddleware doesn't query
+    auth_user on every request. Entries are dropped when the user is saved or
+    deleted (see signals.py), which also covers password changes and logins.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is None and username is not None and password is not None:
+            # ModelBackend, listed next for old sessions, would hash the password
+            # again only to reach the same verdict; PermissionDenied stops there.
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+        return user
@@ -0,0 +1,62 @@
+"""
+Helpers shared by the ``bench_*`` management commands.
+
+Results are plain dicts so runs can be dumped as JSON and compared across
+commits.
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples``."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Recorder:
+    """Thread-safe collector of per-operation latencies, query counts and errors."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, name, seconds, queries=0, ok=True):
+        with self.lock:
+            self.latencies[name].append(seconds * 1000)
+            self.queries[name].append(queries)
+            if not ok:
+                self.errors[name] += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+            'operations': {
+                name: {
+                    'count': len(samples),
+                    'errors': self.errors[name],
+                    'p50_ms': round(percentile(samples, 50), 3),
+                    'p95_ms': round(percentile(samples, 95), 3),
+                    'p99_ms': round(percentile(samples, 99), 3),
+                    'mean_ms': round(sum(samples) / len(samples), 3),
+                    'queries_per_request': round(sum(self.queries[name]) / len(samples), 2),
+                }
+                for name, samples in sorted(self.latencies.items())
+            },
+        }
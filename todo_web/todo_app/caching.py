@@ -0,0 +1,184 @@
+"""
+Per-user cache of dashboard pages.
+
+Each user has a version number in the cache and every cached page key embeds
+it, so invalidating a user's dashboard is a single ``incr`` instead of having
+to find and delete every cached page. Stale versions simply expire.
+
+Invalidation also stamps the time of the change on the user's TaskStats row
+(``modified``), and that stamp makes the dashboard's ETag and Last-Modified
+(see conditional.py). It lives in the database because writes come from
+processes that may not share this cache: other web workers, the scheduler,
+archive_tasks and import_tasks. get_dashboard_marker() reads it on every
+dashboard request, and a stamp this cache hasn't seen moves the cached
+version on, so pages cached before another process's write aren't served.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .filtering import apply_filters
+from .models import Task
+from .pagination import apaginate, paginate
+from .recurrence import upcoming_occurrences, upcoming_window
+from .stats import aget_user_stats, get_user_stats, touch
+
+STATS_KEYS = {
+    'hits': 'dashboard_cache:hits',
+    'misses': 'dashboard_cache:misses',
+}
+
+
+def _version_key(user_id):
+    return f'dashboard_cache:{user_id}:version'
+
+
+def _modified_key(user_id):
+    return f'dashboard_cache:{user_id}:modified'
+
+
+def _user_version(user_id):
+    # Seeded from the clock so a version that was evicted never comes back
+    # with a number that old page keys still use.
+    return cache.get_or_set(_version_key(user_id), time.time_ns, timeout=None)
+
+
+def _key_value(value):
+    # isoformat: str() of a datetime has a space, which memcached keys can't
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def _page_key(user_id, version, params):
+    params_key = ':'.join(f'{name}={_key_value(params[name])}' for name in sorted(params))
+    return f'dashboard_cache:{user_id}:{version}:{params_key}'
+
+
+def _count(name):
+    key = STATS_KEYS[name]
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # evicted between add() and incr(); losing one sample is fine
+        pass
+
+
+async def _acount(name):
+    key = STATS_KEYS[name]
+    await cache.aadd(key, 0, timeout=None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        pass
+
+
+def invalidate_dashboard(user_id):
+    modified = touch(user_id).timestamp()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # no version yet means nothing has been cached for this user
+        pass
+    # this cache is current with the new stamp
+    cache.set(_modified_key(user_id), modified, timeout=None)
+
+
+def _version_changes(user_id, values, modified):
+    """The cache entries that give the user a new version if ``modified`` is a stamp this cache hasn't seen."""
+    if values.get(_version_key(user_id)) is None or values.get(_modified_key(user_id)) != modified:
+        # seeded from the clock, like _user_version(), so old page keys never match
+        return {_version_key(user_id): time.time_ns(), _modified_key(user_id): modified}
+    return None
+
+
+def get_dashboard_marker(user_id):
+    """
+    The modification time of the user's dashboard, which every write changes, from any process.
+
+    It comes from the database, so every worker derives the same validators
+    from it. Moves this cache's version on if the stamp is one it hasn't seen.
+    """
+    modified = get_user_stats(user_id).modified.timestamp()
+    changed = _version_changes(user_id, cache.get_many([_version_key(user_id), _modified_key(user_id)]), modified)
+    if changed:
+        cache.set_many(changed, timeout=None)
+    return modified
+
+
+async def aget_dashboard_marker(user_id):
+    """get_dashboard_marker() for async views."""
+    modified = (await aget_user_stats(user_id)).modified.timestamp()
+    changed = _version_changes(user_id, await cache.aget_many([_version_key(user_id), _modified_key(user_id)]),
+                               modified)
+    if changed:
+        await cache.aset_many(changed, timeout=None)
+    return modified
+
+
+def get_dashboard_page(user, filters=None, **params):
+    """
+    Return the paginated dashboard for ``user``, served from cache when possible.
+
+    ``filters`` are parsed filters (see filtering.parse_filters); ``params``
+    are passed on to paginate().
+    """
+    filters = filters or {}
+    key = _page_key(user.pk, _user_version(user.pk), {**filters, **params})
+    page = cache.get(key)
+    if page is not None:
+        _count('hits')
+        return page
+    _count('misses')
+    page = paginate(apply_filters(Task.objects.for_user(user), filters), **params)
+    cache.set(key, page, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return page
+
+
+async def aget_dashboard_page(user, filters=None, **params):
+    """get_dashboard_page() for async views."""
+    filters = filters or {}
+    version = await cache.aget_or_set(_version_key(user.pk), time.time_ns, timeout=None)
+    key = _page_key(user.pk, version, {**filters, **params})
+    page = await cache.aget(key)
+    if page is not None:
+        await _acount('hits')
+        return page
+    await _acount('misses')
+    page = await apaginate(apply_filters(Task.objects.for_user(user), filters), **params)
+    await cache.aset(key, page, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return page
+
+
+def get_dashboard_summary(user):
+    """The user's task counts, cached alongside their dashboard pages."""
+    key = f'dashboard_cache:{user.pk}:{_user_version(user.pk)}:summary'
+    summary = cache.get(key)
+    if summary is None:
+        task_stats = get_user_stats(user.pk)
+        summary = {field: getattr(task_stats, field) for field in ('total', 'completed', 'pending', 'overdue')}
+        cache.set(key, summary, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return summary
+
+
+def get_upcoming_occurrences(user, today):
+    """The user's recurring task occurrences in the dashboard window starting ``today``, cached."""
+    key = f'dashboard_cache:{user.pk}:{_user_version(user.pk)}:upcoming:{today.isoformat()}'
+    upcoming = cache.get(key)
+    if upcoming is None:
+        upcoming = upcoming_occurrences(user, *upcoming_window(today))
+        cache.set(key, upcoming, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return upcoming
+
+
+def dashboard_cache_stats():
+    hits = cache.get(STATS_KEYS['hits'], 0)
+    misses = cache.get(STATS_KEYS['misses'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+    }
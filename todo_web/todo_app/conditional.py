@@ -0,0 +1,52 @@
+"""
+Conditional GET (ETag / Last-Modified) for the dashboard and task pages.
+
+The views check access first and then derive the page's validators from a
+cheap marker: a task's ``updated_at`` and ``reminder_sent_at`` for its page,
+and for the dashboard the modification time that invalidate_dashboard()
+stamps on the user's TaskStats row on every write, from any process (see
+caching.py). A browser revalidating an unchanged page gets a 304 before any
+template is rendered; for the dashboard, after one primary-key lookup.
+
+The pages embed a CSRF token and one-off flash messages, so the ETag also
+covers the CSRF cookie and nothing is answered with a 304 while messages are
+pending. The ETags are weak: the masked CSRF token changes the bytes of every
+render. Responses are ``private, no-cache`` so browsers always revalidate.
+"""
+import hashlib
+
+from django.contrib import messages
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def page_etag(request, user_id, *marker):
+    """A weak ETag for ``user_id``'s view of a page whose content is determined by ``marker``."""
+    # creates the CSRF secret now if the client has none yet, so the first ETag is already stable
+    get_token(request)
+    parts = (user_id, *marker, request.META['CSRF_COOKIE'])
+    return 'W/"%s"' % hashlib.sha256(':'.join(map(str, parts)).encode()).hexdigest()[:32]
+
+
+def task_validators(request, user_id, task):
+    """(ETag, Last-Modified) of a task's page, which shows whether its reminder was sent."""
+    # claiming a reminder doesn't touch updated_at, so it isn't bumped for sync clients
+    changed = [task.updated_at, *([task.reminder_sent_at] if task.reminder_sent_at else [])]
+    etag = page_etag(request, user_id, task.pk, *(stamp.isoformat() for stamp in changed))
+    return etag, max(changed).timestamp()
+
+
+def add_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(int(last_modified))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(request, etag, last_modified):
+    """A 304 if the client's copy of the page is current, else None."""
+    if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    return add_validators(response, etag, last_modified) if response is not None else None
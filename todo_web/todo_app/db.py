@@ -0,0 +1,25 @@
+"""
+Connection setup for SQLite.
+
+configure_sqlite runs on every new connection (connection_created signal) and
+applies settings.SQLITE_PRAGMAS: WAL lets readers and one writer work at the
+same time, busy_timeout makes writers wait for the lock instead of failing
+with "database is locked", and mmap/cache sizes keep hot pages in memory.
+Together with CONN_MAX_AGE the cost is paid once per connection, not per
+request.
+"""
+import re
+
+from django.conf import settings
+
+PRAGMA_NAME_RE = re.compile(r'^[a-z_]+$')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            if not PRAGMA_NAME_RE.match(name):
+                raise ValueError(f"Invalid SQLite pragma name: {name!r}")
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,146 @@
+"""
+Live task events for open dashboards, streamed as Server-Sent Events.
+
+The write views publish small events (a task was created, updated, completed
+or deleted) to the owner's channel once their transaction commits, and every
+``/events/`` stream the owner has open receives them. Streams are served
+under ASGI only (async_views.task_events); under WSGI ``/events/`` answers
+204 and the dashboard doesn't open one.
+
+The broker is pluggable through TASK_EVENTS_BROKER. The default,
+InProcessBroker, only reaches streams served by the same process: run one
+ASGI worker, or plug in a broker backed by a shared channel (e.g. Redis
+pub/sub) with the same ``publish``/``subscribe`` interface.
+
+A stream is an async generator waiting on an asyncio.Queue, so an idle
+connection costs a queue and a coroutine rather than a thread. Queues are
+bounded: a client that falls SSE_QUEUE_SIZE events behind gets a ``resync``
+event and its stream is closed, and streams end after SSE_MAX_STREAM_SECONDS
+so connections whose client went away are not kept forever. Browsers'
+EventSource reconnects by itself in both cases.
+"""
+import asyncio
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+RESYNC = {'type': 'resync'}
+
+
+class Subscription:
+    def __init__(self, broker, user_id, maxsize):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Called on the subscriber's event loop."""
+        if self.overflowed:
+            return
+        if self.queue.full():
+            # the client is too far behind to catch up event by event
+            self.overflowed = True
+            self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fans events out to the subscriptions of the current process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def subscribe(self, user_id):
+        """Must be called from the event loop that will read the subscription."""
+        subscription = Subscription(self, user_id, getattr(settings, 'SSE_QUEUE_SIZE', 100))
+        with self.lock:
+            self.subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.user_id, None)
+
+    def publish(self, user_id, event):
+        """Thread-safe; views call this from worker threads."""
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # the subscriber's loop has been closed
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self.lock:
+            return sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'TASK_EVENTS_BROKER', 'todo_app.events.InProcessBroker'))()
+
+
+def task_payload(task):
+    return {'id': task.pk, 'title': task.title, 'expire_at': task.expire_at,
+            'status': task.get_status_display()}
+
+
+def publish_task_event(user_id, kind, task=None, ids=None):
+    """Publish ``task.<kind>`` to ``user_id``'s streams after the current transaction commits."""
+    event = {'type': f'task.{kind}'}
+    if task is not None:
+        event['task'] = task_payload(task)
+    if ids is not None:
+        event['ids'] = sorted(ids)
+    transaction.on_commit(lambda: get_broker().publish(user_id, event))
+
+
+def format_event(event):
+    data = json.dumps(event, cls=DjangoJSONEncoder)
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+async def event_stream(user_id, keepalive=None, max_seconds=None):
+    """Yield SSE frames for ``user_id`` until the stream times out or falls behind."""
+    keepalive = keepalive or getattr(settings, 'SSE_KEEPALIVE_SECONDS', 15)
+    max_seconds = max_seconds or getattr(settings, 'SSE_MAX_STREAM_SECONDS', 300)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    subscription = get_broker().subscribe(user_id)
+    try:
+        # tells EventSource how soon to reconnect once the stream ends
+        yield f"retry: {int(getattr(settings, 'SSE_RETRY_MS', 2000))}\n\n"
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=min(keepalive, remaining))
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(event)
+            if event is RESYNC:
+                return
+    finally:
+        subscription.close()
@@ -0,0 +1,48 @@
+"""
+Streaming export of a user's tasks.
+
+Rows are read with ``.iterator()`` and encoded one at a time, so memory use
+does not grow with the number of tasks being exported.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Task
+
+EXPORT_FIELDS = ('id', 'title', 'description', 'created_at', 'expire_at', 'status')
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+class Echo:
+    """File-like object whose write() hands the row straight back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset):
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    rows = queryset.order_by('expire_at', 'id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    # exports keep the status labels; the integer codes are a storage detail
+    labels = dict(Task.Status.choices)
+    for row in rows:
+        yield row[:-1] + (labels[row[-1]],)
+
+
+def stream_csv(queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in iter_rows(queryset):
+        yield writer.writerow(row)
+
+
+def stream_ndjson(queryset):
+    for row in iter_rows(queryset):
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + "\n"
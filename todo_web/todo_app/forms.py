@@ -1,7 +1,7 @@
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django import forms
-from .models import Task
+from .models import RecurringTask, Task
 
 
 class SignUpForm(UserCreationForm):
@@ -46,7 +46,38 @@ class ScheduleTaskForm(forms.ModelForm):
     expire_at = forms.DateTimeField(required=True,
                                     widget=forms.DateTimeInput(attrs={"type": "datetime-local"}),
                                     label="Due date:")
+    remind_before = forms.IntegerField(required=False, min_value=0, widget=forms.widgets.NumberInput(
+        attrs={"placeholder": "Remind me this many minutes before (optional)", "class": "form-control"}), label="")
 
     class Meta:
         model = Task
         exclude = ("created_at", "status", "user_id",)
+
+
+class RecurringTaskForm(forms.ModelForm):
+    title = forms.CharField(required=True, widget=forms.widgets.TextInput(
+        attrs={"placeholder": "Task Title", "class": "form-control"}), label="")
+    description = forms.CharField(required=True, widget=forms.widgets.Textarea(
+        attrs={"placeholder": "Task Description", "class": "form-control"}), label="")
+    frequency = forms.TypedChoiceField(choices=RecurringTask.Frequency.choices, coerce=int, label="Repeats:",
+                                       widget=forms.Select(attrs={"class": "form-select"}))
+    interval = forms.IntegerField(min_value=1, initial=1, label="Every (days, weeks or months):",
+                                  widget=forms.widgets.NumberInput(attrs={"class": "form-control"}))
+    starts_at = forms.DateTimeField(required=True,
+                                    widget=forms.DateTimeInput(attrs={"type": "datetime-local"}),
+                                    label="First due date:")
+    ends_at = forms.DateTimeField(required=False,
+                                  widget=forms.DateTimeInput(attrs={"type": "datetime-local"}),
+                                  label="Repeat until (optional):")
+
+    class Meta:
+        model = RecurringTask
+        fields = ("title", "description", "frequency", "interval", "starts_at", "ends_at")
+
+
+class ImportTasksForm(forms.Form):
+    file = forms.FileField(label="Task file (CSV or NDJSON)",
+                           widget=forms.ClearableFileInput(attrs={"class": "form-control"}))
+    format = forms.ChoiceField(required=False, label="Format",
+                               choices=[("", "Detect from file name"), ("csv", "CSV"), ("ndjson", "NDJSON")],
+                               widget=forms.Select(attrs={"class": "form-select"}))
@@ -0,0 +1,22 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from todo_app.archiving import archive_completed_tasks
+
+
+class Command(BaseCommand):
+    help = "Move completed tasks due more than --older-than days ago into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, metavar='DAYS')
+        parser.add_argument('--batch-size', type=int, help="Tasks moved per transaction.")
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0:
+            raise CommandError("--older-than must not be negative.")
+        started = time.perf_counter()
+        moved = archive_completed_tasks(timedelta(days=options['older_than']), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} task(s) in {time.perf_counter() - started:.2f}s"))
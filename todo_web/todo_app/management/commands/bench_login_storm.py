@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from todo_app.benchmarking import Recorder
+
+
+class Command(BaseCommand):
+    help = ("Fire a burst of logins while logged-in clients keep loading their dashboards, once through "
+            "the sync views on a fixed pool of worker threads (like a WSGI server) and once through the "
+            "async views on an event loop (like an ASGI server), and report dashboard and login latency "
+            "percentiles as JSON. Uses seeded users (see seed_tasks); use a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=8, help="Number of seeded users to drive.")
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--logins', type=int, default=40, help="Logins fired at once.")
+        parser.add_argument('--dashboard-clients', type=int, default=4,
+                            help="Logged-in clients loading their dashboard in a loop.")
+        parser.add_argument('--dashboard-requests', type=int, default=30, help="Dashboard loads per client.")
+        parser.add_argument('--wsgi-threads', type=int, default=8, help="Worker threads of the sync server.")
+        parser.add_argument('--mode', choices=('wsgi', 'asgi', 'both'), default='both')
+        parser.add_argument('--host', default='localhost',
+                            help="Host header of the sync requests; must be in ALLOWED_HOSTS.")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(username__startswith=f"{options['prefix']}-")
+                     .order_by('id')[:options['users']])
+        if not users:
+            raise CommandError(f"No users with prefix {options['prefix']!r}; run seed_tasks first.")
+
+        report = {'config': {name: options[name] for name in
+                             ('users', 'logins', 'dashboard_clients', 'dashboard_requests', 'wsgi_threads')}}
+        if options['mode'] in ('wsgi', 'both'):
+            report['wsgi'] = self.run_wsgi(users, options).summary()
+        if options['mode'] in ('asgi', 'both'):
+            # AsyncClient always sends Host: testserver
+            with override_settings(ROOT_URLCONF='todo_web.asgi_urls',
+                                   ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                report['asgi'] = asyncio.run(self.run_asgi(users, options)).summary()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def login_data(self, users, i, options):
+        return {'username': users[i % len(users)].username, 'password': options['password']}
+
+    def dashboard_clients(self, make_client, users, options):
+        clients = []
+        for i in range(options['dashboard_clients']):
+            client = make_client()
+            client.force_login(users[i % len(users)])
+            clients.append(client)
+        return clients
+
+    def run_wsgi(self, users, options):
+        """Every request is a job on one pool of worker threads; latency includes the wait for a worker."""
+        recorder = Recorder()
+
+        def make_client():
+            return Client(raise_request_exception=False, headers={'host': options['host']})
+
+        clients = self.dashboard_clients(make_client, users, options)
+
+        def serve(name, client, method, path, data, submitted):
+            response = getattr(client, method)(path, data)
+            recorder.record(name, time.perf_counter() - submitted, ok=response.status_code < 400)
+
+        with ThreadPoolExecutor(options['wsgi_threads']) as workers:
+            def dashboard_loop(client):
+                for _ in range(options['dashboard_requests']):
+                    workers.submit(serve, 'dashboard', client, 'get', reverse('dashboard'), {},
+                                   time.perf_counter()).result()
+
+            loops = [threading.Thread(target=dashboard_loop, args=(client,)) for client in clients]
+            for loop in loops:
+                loop.start()
+            logins = [workers.submit(serve, 'login', make_client(), 'post', reverse('login'),
+                                     self.login_data(users, i, options), time.perf_counter())
+                      for i in range(options['logins'])]
+            for loop in loops:
+                loop.join()
+            for login in logins:
+                login.result()
+        recorder.stop()
+        return recorder
+
+    async def run_asgi(self, users, options):
+        """Every request is a coroutine on one event loop, as under an ASGI server."""
+        recorder = Recorder()
+
+        def make_client():
+            return AsyncClient(raise_request_exception=False)
+
+        clients = await asyncio.to_thread(self.dashboard_clients, make_client, users, options)
+
+        async def serve(name, client, method, path, data=None):
+            started = time.perf_counter()
+            # ASGIHandler gives each request its own thread for sync code; AsyncClient doesn't
+            async with ThreadSensitiveContext():
+                response = await getattr(client, method)(path, data or {})
+            recorder.record(name, time.perf_counter() - started, ok=response.status_code < 400)
+
+        async def dashboard_loop(client):
+            for _ in range(options['dashboard_requests']):
+                await serve('dashboard', client, 'get', reverse('dashboard'))
+
+        await asyncio.gather(
+            *(dashboard_loop(client) for client in clients),
+            *(serve('login', make_client(), 'post', reverse('login'), self.login_data(users, i, options))
+              for i in range(options['logins'])))
+        recorder.stop()
+        return recorder
@@ -0,0 +1,52 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from todo_app.search import naive_search, search_tasks
+from todo_app.seeding import VOCABULARY, seed_tasks, seed_users
+
+
+class Command(BaseCommand):
+    help = ("Benchmark FTS5 task search against the naive LIKE query. The seeded data is created "
+            "inside a transaction that is rolled back, so the database is left unchanged.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--tasks-per-user', type=int, default=5000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("FTS5 search is only available on SQLite.")
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            users = self.seed(rng, options['users'], options['tasks_per_user'])
+            queries = [(rng.choice(users), rng.choice(VOCABULARY)) for _ in range(options['queries'])]
+            limit = getattr(settings, 'SEARCH_RESULTS_LIMIT', 50)
+            fts = self.measure(queries, lambda user, term: search_tasks(user, term, limit))
+            like = self.measure(queries, lambda user, term: list(naive_search(user, term)[:limit]))
+            transaction.set_rollback(True)
+
+        for name, timings in (("FTS5", fts), ("LIKE", like)):
+            self.stdout.write(f"{name}: median {statistics.median(timings):.2f} ms, "
+                              f"p95 {statistics.quantiles(timings, n=20)[-1]:.2f} ms")
+        self.stdout.write(f"Speedup (median): {statistics.median(like) / statistics.median(fts):.1f}x")
+
+    def seed(self, rng, user_count, tasks_per_user):
+        users = seed_users(user_count, prefix=f"bench-search-{rng.random()}")
+        created = seed_tasks(users, tasks_per_user, seed=rng.random())
+        self.stdout.write(f"Seeded {created} tasks for {user_count} users")
+        return users
+
+    def measure(self, queries, search):
+        timings = []
+        for user, term in queries:
+            started = time.perf_counter()
+            search(user, term)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
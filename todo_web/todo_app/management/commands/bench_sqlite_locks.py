@@ -0,0 +1,96 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from todo_app.benchmarking import Recorder
+
+SCHEMA = """
+    CREATE TABLE task (id INTEGER PRIMARY KEY, user_id INTEGER, title TEXT, status TEXT, expire_at TEXT);
+    CREATE INDEX task_user_idx ON task (user_id, expire_at);
+"""
+
+# Django's defaults: rollback journal, FULL sync, sqlite3's 5 s timeout, and
+# a new connection for every request (CONN_MAX_AGE = 0).
+BASELINE = {'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'}, 'persistent': False}
+
+
+class Command(BaseCommand):
+    help = ("Measure SQLite lock contention with concurrent readers and writers, with Django's "
+            "default connection setup and with SQLITE_PRAGMAS plus persistent connections. "
+            "Runs against a temporary database file and prints a JSON report.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds per configuration.")
+        parser.add_argument('--rows', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        tuned = {'pragmas': settings.SQLITE_PRAGMAS, 'persistent': True}
+        report = {name: self.run(config, options) for name, config in (('baseline', BASELINE), ('tuned', tuned))}
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, config, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            setup = sqlite3.connect(path)
+            setup.executescript(SCHEMA)
+            setup.executemany("INSERT INTO task (user_id, title, status, expire_at) VALUES (?, ?, ?, ?)",
+                              ((i % 100, f"task {i}", 'Not Completed', f"2030-01-01 00:{i % 60:02d}:00")
+                               for i in range(options['rows'])))
+            setup.commit()
+            setup.close()
+
+            recorder = Recorder()
+            deadline = time.perf_counter() + options['duration']
+            threads = ([threading.Thread(target=self.worker, args=(path, config, recorder, deadline, 'write'))
+                        for _ in range(options['writers'])] +
+                       [threading.Thread(target=self.worker, args=(path, config, recorder, deadline, 'read'))
+                        for _ in range(options['readers'])])
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            recorder.stop()
+            return recorder.summary()
+
+    def connect(self, path, config):
+        # isolation_level=None: autocommit, as Django runs outside atomic blocks
+        connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        for name, value in config['pragmas'].items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+
+    def worker(self, path, config, recorder, deadline, kind):
+        rng = random.Random()
+        connection = self.connect(path, config) if config['persistent'] else None
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            ok = True
+            conn = connection or self.connect(path, config)
+            try:
+                user_id = rng.randrange(100)
+                if kind == 'write':
+                    # schedule_task then mark_complete: autocommit statements, as the views issue them
+                    conn.execute("INSERT INTO task (user_id, title, status, expire_at) VALUES (?, 'new', "
+                                 "'Not Completed', '2030-01-01 00:00:00')", (user_id,))
+                    conn.execute("UPDATE task SET status = 'Completed' WHERE id = ? AND user_id = ?",
+                                 (rng.randrange(1, 1000), user_id))
+                else:
+                    conn.execute("SELECT id, title, status FROM task WHERE user_id = ? ORDER BY expire_at "
+                                 "LIMIT 25", (user_id,)).fetchall()
+            except sqlite3.OperationalError:  # "database is locked"
+                ok = False
+            finally:
+                if connection is None:
+                    conn.close()
+            recorder.record(kind, time.perf_counter() - started, ok=ok)
+        if connection is not None:
+            connection.close()
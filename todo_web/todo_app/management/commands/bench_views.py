@@ -0,0 +1,90 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from todo_app.benchmarking import Recorder
+from todo_app.models import Task
+
+
+class Command(BaseCommand):
+    help = ("Drive login, dashboard, task, schedule_task, mark_task and delete_task through the test "
+            "client with seeded users (see seed_tasks) and report latency percentiles, throughput and "
+            "queries per request as JSON. Writes to the configured database: use a scratch copy.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Number of seeded users to drive.")
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--iterations', type=int, default=20, help="Scenario loops per user.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Users driven in parallel threads.")
+        parser.add_argument('--host', default='localhost', help="Host header; must be in ALLOWED_HOSTS.")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(username__startswith=f"{options['prefix']}-")
+                     .order_by('id')[:options['users']])
+        if not users:
+            raise CommandError(f"No users with prefix {options['prefix']!r}; run seed_tasks first.")
+
+        recorder = Recorder()
+        if options['concurrency'] == 1:
+            for user in users:
+                self.drive(user, recorder, options)
+        else:
+            with ThreadPoolExecutor(options['concurrency']) as pool:
+                for future in [pool.submit(self.drive_in_thread, user, recorder, options) for user in users]:
+                    future.result()
+        recorder.stop()
+
+        report = {
+            'config': {name: options[name] for name in ('users', 'iterations', 'concurrency')},
+            **recorder.summary(),
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def drive_in_thread(self, user, recorder, options):
+        try:
+            self.drive(user, recorder, options)
+        finally:
+            connection.close()
+
+    def drive(self, user, recorder, options):
+        client = Client(raise_request_exception=False, SERVER_NAME=options['host'])
+
+        def call(name, method, path, data=None):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, method)(path, data or {})
+                elapsed = time.perf_counter() - started
+            recorder.record(name, elapsed, len(queries), ok=response.status_code < 400)
+            return response
+
+        response = call('login', 'post', reverse('login'),
+                        {'username': user.username, 'password': options['password']})
+        if response.status_code != 302 or not response.url.startswith(reverse('dashboard')):
+            raise CommandError(f"Could not log in as {user.username}; check --password and --host.")
+
+        for _ in range(options['iterations']):
+            call('dashboard', 'get', reverse('dashboard'))
+            call('schedule_task', 'post', reverse('schedule_task'), {
+                'title': 'Benchmark task', 'description': 'created by bench_views',
+                'expire_at': timezone.now() + timedelta(days=1)})
+            task_id = Task.objects.for_user(user).latest('id').pk
+            call('task', 'get', reverse('task', kwargs={'pk': task_id}))
+            call('mark_task', 'post', reverse('mark_task', kwargs={'pk': task_id}),
+                 {'new_status': Task.Status.COMPLETED.value})
+            call('delete_task', 'get', reverse('delete_task', kwargs={'pk': task_id}))
@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from todo_app.importing import IMPORT_FORMATS, guess_format, import_tasks, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import tasks for a user from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help="Username that will own the imported tasks.")
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help="File format. Guessed from the file extension when omitted.")
+        parser.add_argument('--batch-size', type=int, help="Rows per bulk insert transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+
+        import_format = options['format'] or guess_format(options['path'])
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            result = import_tasks(user, read_rows(stream, import_format), batch_size=options['batch_size'])
+
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} task(s), {len(result.errors)} error(s) "
+            f"in {result.elapsed:.2f}s ({result.rows_per_second} rows/s)"))
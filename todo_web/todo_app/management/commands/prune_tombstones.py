@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from todo_app.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than SYNC_TOMBSTONE_DAYS."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Pruned {prune_tombstones()} tombstone(s)")
@@ -0,0 +1,19 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from todo_app.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's task counters from the task table, a batch of users at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users recomputed per transaction.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        users = rebuild_stats(User.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt task counters for {users} user(s) in {time.perf_counter() - started:.2f}s"))
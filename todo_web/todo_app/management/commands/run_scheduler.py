@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from todo_app.scheduler import DeadlineScheduler
+
+
+class Command(BaseCommand):
+    help = "Run the worker that marks tasks overdue when their due date passes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Process a single tick and exit.")
+        parser.add_argument('--window', type=int, help="Number of upcoming deadlines kept in memory.")
+        parser.add_argument('--batch-size', type=int, help="Tasks marked overdue per UPDATE.")
+        parser.add_argument('--max-sleep', type=float, help="Longest time in seconds between two ticks.")
+
+    def handle(self, *args, **options):
+        scheduler = DeadlineScheduler(window=options['window'], batch_size=options['batch_size'],
+                                      max_sleep=options['max_sleep'])
+        while True:
+            marked, sleep_for = scheduler.run_once()
+            if marked:
+                self.stdout.write(f"Marked {marked} task(s) overdue")
+            if options['once']:
+                return
+            time.sleep(sleep_for)
@@ -0,0 +1,33 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from todo_app.seeding import seed_tasks, seed_username, seed_users
+
+
+class Command(BaseCommand):
+    help = "Create synthetic users and tasks with bulk inserts, for benchmarks and load tests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, required=True)
+        parser.add_argument('--tasks-per-user', type=int, required=True)
+        parser.add_argument('--prefix', default='seed', help="Usernames are <prefix>-<n>.")
+        parser.add_argument('--password', default='seed-password', help="Password shared by all seeded users.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, help="Random seed, for reproducible datasets.")
+
+    def handle(self, *args, **options):
+        usernames = [seed_username(options['prefix'], i) for i in range(options['users'])]
+        if User.objects.filter(username__in=usernames).exists():
+            raise CommandError(f"Users with prefix {options['prefix']!r} already exist; pick another --prefix.")
+
+        started = time.perf_counter()
+        users = seed_users(options['users'], prefix=options['prefix'], password=options['password'],
+                           batch_size=options['batch_size'])
+        created = seed_tasks(users, options['tasks_per_user'], batch_size=options['batch_size'],
+                             seed=options['seed'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} user(s) and {created} task(s) in {elapsed:.2f}s "
+            f"({created / elapsed if elapsed else 0:.0f} tasks/s)"))
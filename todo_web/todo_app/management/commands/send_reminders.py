@@ -0,0 +1,35 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from todo_app.reminders import send_due_reminders
+
+logger = logging.getLogger('todo_app.reminders')
+
+
+class Command(BaseCommand):
+    help = "Send due-date reminder emails for tasks with a reminder set."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Send the reminders due now and exit.")
+        parser.add_argument('--batch-size', type=int, help="Reminders read and sent per batch.")
+        parser.add_argument('--interval', type=float, help="Seconds between two polls.")
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or getattr(settings, 'REMINDER_POLL_INTERVAL', 30)
+        while True:
+            try:
+                sent = send_due_reminders(batch_size=options['batch_size'])
+            except Exception:
+                if options['once']:
+                    raise
+                # the failed batch was released; the next poll sends it again
+                logger.exception("Sending reminders failed")
+                sent = 0
+            if sent:
+                self.stdout.write(f"Sent {sent} reminder(s)")
+            if options['once']:
+                return
+            time.sleep(interval)
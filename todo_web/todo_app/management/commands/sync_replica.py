@@ -0,0 +1,45 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from todo_app.routers import REPLICA
+
+
+def sync_sqlite_database(source, target):
+    """Copy ``source`` into ``target`` with SQLite's online backup API."""
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target)
+    try:
+        source_connection.backup(target_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
+
+
+class Command(BaseCommand):
+    help = ("Copy the default SQLite database to the replica. Stands in for replication "
+            "when running the read replica locally with two SQLite files.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help="Keep syncing every INTERVAL seconds instead of syncing once.")
+        parser.add_argument('--source', help="Defaults to the NAME of the default database.")
+        parser.add_argument('--target', help="Defaults to the NAME of the replica database.")
+
+    def handle(self, *args, **options):
+        source = options['source'] or connections['default'].settings_dict['NAME']
+        target = options['target']
+        if not target:
+            if REPLICA not in connections.settings:
+                raise CommandError("No 'replica' database configured; set TODO_REPLICA_DB or pass --target.")
+            target = connections[REPLICA].settings_dict['NAME']
+
+        while True:
+            started = time.perf_counter()
+            sync_sqlite_database(str(source), str(target))
+            self.stdout.write(f"Synced {source} -> {target} in {time.perf_counter() - started:.3f}s")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,221 @@
+"""
+Per-view request metrics in the Prometheus text format.
+
+MetricsMiddleware times every request and, through a database execute
+wrapper installed on every connection, counts and times its queries; InstrumentedDjangoTemplates (used as
+the template backend) adds template render time. Each request's figures are
+collected in a context variable and folded into process-wide histograms
+once, at the end of the request, under a single lock. Figures are per process:
+scrape each worker separately. The middleware works under WSGI and ASGI
+alike: the context variable follows an async request into the threads its
+database calls run in.
+
+With SLOW_REQUEST_THRESHOLD_MS set, requests slower than the threshold are
+logged to ``todo_app.slow_requests`` together with the SQL they ran.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+
+from .caching import dashboard_cache_stats
+
+logger = logging.getLogger('todo_app.slow_requests')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    'todo_request_duration_seconds': ("Request latency by view.", LATENCY_BUCKETS),
+    'todo_request_db_queries': ("Database queries per request by view.", QUERY_COUNT_BUCKETS),
+    'todo_request_db_duration_seconds': ("Database time per request by view.", LATENCY_BUCKETS),
+    'todo_request_template_duration_seconds': ("Template render time per request by view.", LATENCY_BUCKETS),
+}
+
+MAX_LOGGED_QUERIES = 200
+
+_current = ContextVar('todo_request_metrics', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'template_time', 'statements')
+
+    def __init__(self, capture_sql):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = [] if capture_sql else None
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.responses = {}
+
+    def observe(self, view, status, latency, stats):
+        values = {
+            'todo_request_duration_seconds': latency,
+            'todo_request_db_queries': stats.queries,
+            'todo_request_db_duration_seconds': stats.db_time,
+            'todo_request_template_duration_seconds': stats.template_time,
+        }
+        with self.lock:
+            for name, value in values.items():
+                key = (name, view)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(HISTOGRAMS[name][1])
+                self.histograms[key].observe(value)
+            response_key = (view, str(status))
+            self.responses[response_key] = self.responses.get(response_key, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.responses.clear()
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for name, (help_text, buckets) in HISTOGRAMS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (metric, view), histogram in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{view="{view}"}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{view="{view}"}} {cumulative}')
+            lines += ["# HELP todo_responses_total Responses by view and status code.",
+                      "# TYPE todo_responses_total counter"]
+            for (view, status), count in sorted(self.responses.items()):
+                lines.append(f'todo_responses_total{{view="{view}",status="{status}"}} {count}')
+
+        cache_stats = dashboard_cache_stats()
+        lines += ["# HELP todo_dashboard_cache_requests_total Dashboard cache lookups by result.",
+                  "# TYPE todo_dashboard_cache_requests_total counter",
+                  f'todo_dashboard_cache_requests_total{{result="hit"}} {cache_stats["hits"]}',
+                  f'todo_dashboard_cache_requests_total{{result="miss"}} {cache_stats["misses"]}']
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_time += duration
+        if stats.statements is not None and len(stats.statements) < MAX_LOGGED_QUERIES:
+            stats.statements.append((duration, sql))
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver: time every query the connection runs."""
+    # Installed once per connection rather than around each request, so it
+    # also sees queries an async request runs in other threads. First in the
+    # list, so execute_wrapper() blocks opened before it keep popping their own.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, started)
+
+    def start(self):
+        stats = RequestStats(capture_sql=getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', None) is not None)
+        return stats, _current.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, started):
+        latency = time.perf_counter() - started
+        threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', None)
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        registry.observe(view, response.status_code, latency, stats)
+        if threshold is not None and latency * 1000 >= threshold:
+            log_slow_request(request, view, latency, stats)
+        return response
+
+
+def log_slow_request(request, view, latency, stats):
+    statements = "\n".join(f"  {duration * 1000:8.2f} ms  {sql}" for duration, sql in stats.statements)
+    logger.warning("Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, template %.1f ms\n%s",
+                   request.method, request.path, view, latency * 1000, stats.queries,
+                   stats.db_time * 1000, stats.template_time * 1000, statements)
+
+
+class InstrumentedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    @property
+    def origin(self):
+        return self.template.origin
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats = _current.get()
+            if stats is not None:
+                stats.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time reported to MetricsMiddleware."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
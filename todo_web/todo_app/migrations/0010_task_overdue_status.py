@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0009_task_user_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='status',
+            field=models.CharField(choices=[('Completed', 'Completed'), ('Not Completed', 'Not Completed'), ('Overdue', 'Overdue')], default='Not Completed', max_length=15),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'expire_at'], name='task_status_due_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0010_task_overdue_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='remind_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='remind_before',
+            field=models.PositiveIntegerField(blank=True, help_text='Minutes before the due date to send a reminder.', null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('reminder_sent_at__isnull', True)), fields=['remind_at'], name='task_reminder_due_idx'),
+        ),
+    ]
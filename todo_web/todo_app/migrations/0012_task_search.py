@@ -0,0 +1,33 @@
+from django.db import migrations
+
+# The FTS5 table is SQLite-only; on other databases search falls back to
+# todo_app.search.naive_search. Its sync triggers are installed after every
+# migrate by todo_app.search.ensure_search_triggers.
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS todo_app_task_fts USING fts5("
+        "title, description, user_id_id, content='todo_app_task', content_rowid='id')")
+    schema_editor.execute("INSERT INTO todo_app_task_fts(todo_app_task_fts) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for trigger in ('insert', 'delete', 'update'):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS todo_app_task_fts_{trigger}")
+    schema_editor.execute("DROP TABLE IF EXISTS todo_app_task_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0011_task_reminders'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations, transaction
+
+# Old label -> new integer code (Task.Status).
+STATUS_CODES = {
+    'Not Completed': 0,
+    'Completed': 1,
+    'Overdue': 2,
+}
+
+# Values older schemas allowed: 'D'/'ND' (0002), 'Done'/'Not Done' (0003), and the
+# boolean of 0001 as it reads once the column is text.
+LEGACY_STATUS_CODES = {
+    'D': 1,
+    'Done': 1,
+    'True': 1,
+    'true': 1,
+    'ND': 0,
+    'Not Done': 0,
+    'False': 0,
+    'false': 0,
+}
+
+BATCH_SIZE = 5000
+
+
+def convert(apps, mapping):
+    """Rewrite status values in place, BATCH_SIZE rows per transaction."""
+    Task = apps.get_model('todo_app', 'Task')
+    for old, new in mapping.items():
+        while True:
+            with transaction.atomic():
+                ids = list(Task.objects.filter(status=old).values_list('id', flat=True)[:BATCH_SIZE])
+                if not ids:
+                    break
+                Task.objects.filter(id__in=ids).update(status=new)
+
+
+def labels_to_codes(apps, schema_editor):
+    # Still a text column here; 0015 turns it into an integer column.
+    convert(apps, {label: str(code) for label, code in {**STATUS_CODES, **LEGACY_STATUS_CODES}.items()})
+    Task = apps.get_model('todo_app', 'Task')
+    codes = [str(code) for code in STATUS_CODES.values()]
+    unknown = sorted(set(Task.objects.exclude(status__in=codes).values_list('status', flat=True)))
+    if unknown:
+        # the integer column would take them as text and break every status lookup
+        raise ValueError(f"Tasks have unknown status values {unknown}; map them in STATUS_CODES "
+                         f"or LEGACY_STATUS_CODES and migrate again")
+
+
+def codes_to_labels(apps, schema_editor):
+    convert(apps, {str(code): label for label, code in STATUS_CODES.items()})
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own, so a large table is never locked for the whole conversion.
+    atomic = False
+
+    dependencies = [
+        ('todo_app', '0013_task_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(labels_to_codes, codes_to_labels),
+    ]
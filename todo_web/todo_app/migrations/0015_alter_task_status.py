@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0014_task_status_codes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Not Completed'), (1, 'Completed'), (2, 'Overdue')], default=0),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('todo_app', '0015_alter_task_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.TextField(max_length=50)),
+                ('description', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('expire_at', models.DateTimeField()),
+                ('status', models.PositiveSmallIntegerField(choices=[(0, 'Not Completed'), (1, 'Completed'), (2, 'Overdue')], default=1)),
+                ('archived_at', models.DateTimeField()),
+                ('user_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'expire_at'], name='archived_user_due_idx')],
+            },
+        ),
+    ]
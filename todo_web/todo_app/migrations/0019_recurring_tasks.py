@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:02
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('todo_app', '0018_dashboard_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.TextField(max_length=50)),
+                ('description', models.TextField()),
+                ('frequency', models.PositiveSmallIntegerField(choices=[(0, 'Daily'), (1, 'Weekly'), (2, 'Monthly')], default=1)),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Repeat every this many days, weeks or months.', validators=[django.core.validators.MinValueValidator(1)])),
+                ('starts_at', models.DateTimeField(help_text='Due date of the first occurrence.')),
+                ('ends_at', models.DateTimeField(blank=True, help_text='No occurrences are due after this.', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='occurrence_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text="The occurrence's original due date.", null=True),
+        ),
+        migrations.AddField(
+            model_name='tasktombstone',
+            name='occurrence_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recurringtask',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_tasks', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='todo_app.recurringtask'),
+        ),
+        migrations.AddField(
+            model_name='tasktombstone',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='todo_app.recurringtask'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringtask',
+            index=models.Index(fields=['user', 'starts_at'], name='recurring_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktombstone',
+            index=models.Index(fields=['recurrence', 'occurrence_at'], name='tombstone_occurrence_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(fields=('recurrence', 'occurrence_at'), name='task_recurrence_occurrence_uniq'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0019_recurring_tasks'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_reminder_due_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('reminder_sent_at__isnull', True), ('status', 0)), fields=['status', 'remind_at'], name='task_reminder_due_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0020_pending_reminder_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskstats',
+            name='modified',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
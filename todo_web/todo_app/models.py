@@ -1,26 +1,244 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
 
 # Create your models here.
+class TaskQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """Restrict to tasks owned by ``user``; lookups on other users' tasks behave as not found."""
+        return self.filter(user_id=user)
+
+    def set_status(self, status):
+        """
+        Move the selected tasks to ``status``. Returns ``{old_status: rows}`` for the rows that changed.
+
+        One UPDATE per previous status, so the per-status row counts are exact
+        without reading the rows first.
+        """
+        changed = {}
+        now = timezone.now()
+        for old_status in Task.Status:
+            if old_status != status:
+                rows = self.filter(status=old_status).update(status=status, updated_at=now)
+                if rows:
+                    changed[old_status] = rows
+        return changed
+
+    def delete_rows(self):
+        """
+        Delete the selected tasks with a single DELETE. Returns the number of rows.
+
+        Skips Django's collector, which would SELECT the rows first to send
+        post_delete for each; callers invalidate the dashboards themselves.
+        Nothing references Task with a foreign key, so there is nothing to cascade.
+        _raw_delete() is the collector's own fast path for exactly that case
+        (QuerySet.delete() calls it when it can skip the SELECT), so it
+        deletes what delete() would, minus the signals.
+        """
+        query = self._chain()
+        # routes query.db through db_for_write, as QuerySet.delete() does; reads may go to a replica
+        query._for_write = True
+        return query._raw_delete(query.db)
+
+    def delete_by_status(self):
+        """Delete the selected tasks. Returns ``{status: rows}`` for the rows deleted."""
+        deleted = {}
+        for status in Task.Status:
+            rows = self.filter(status=status).delete_rows()
+            if rows:
+                deleted[status] = rows
+        return deleted
+
+
 class Task(models.Model):
-    STATUS_CHOICES = [
-        ("Completed", "Completed" ),
-        ("Not Completed", "Not Completed" )
-    ]
+    class Status(models.IntegerChoices):
+        NOT_COMPLETED = 0, "Not Completed"
+        COMPLETED = 1, "Completed"
+        OVERDUE = 2, "Overdue"
+
+        @classmethod
+        def parse(cls, value):
+            """Accept a status by number or by label; raises ValueError for anything else."""
+            for status in cls:
+                if value in (str(status.value), status.label):
+                    return status
+            raise ValueError(f"Invalid status: {value}")
+
     title = models.TextField(max_length=50)
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # auto_now only covers save(); queryset updates must set it themselves
+    updated_at = models.DateTimeField(auto_now=True)
     expire_at = models.DateTimeField()
-    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='Not Completed')
+    status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.NOT_COMPLETED)
     user_id = models.ForeignKey(User, on_delete=models.CASCADE)
+    remind_before = models.PositiveIntegerField(null=True, blank=True,
+                                                help_text="Minutes before the due date to send a reminder.")
+    remind_at = models.DateTimeField(null=True, blank=True, editable=False)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # set on tasks materialized from a recurrence rule; see todo_app.recurrence
+    recurrence = models.ForeignKey('RecurringTask', on_delete=models.SET_NULL, null=True, blank=True,
+                                   editable=False, db_index=False, related_name='occurrences')
+    occurrence_at = models.DateTimeField(null=True, blank=True, editable=False,
+                                         help_text="The occurrence's original due date.")
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        # Every view filters by owner first, so each index leads with user_id.
+        indexes = [
+            models.Index(fields=['user_id', 'expire_at'], name='task_user_due_idx'),
+            models.Index(fields=['user_id', 'status', 'expire_at'], name='task_user_status_due_idx'),
+            models.Index(fields=['user_id', 'created_at'], name='task_user_created_idx'),
+            # dashboard sorts (filtering.SORTS), alone and after a status filter
+            models.Index(fields=['user_id', 'title'], name='task_user_title_idx'),
+            models.Index(fields=['user_id', 'status', 'created_at'], name='task_user_status_created_idx'),
+            models.Index(fields=['user_id', 'status', 'title'], name='task_user_status_title_idx'),
+            models.Index(fields=['user_id', 'updated_at'], name='task_user_updated_idx'),
+            # not per-user: the overdue sweeper scans pending deadlines across all users
+            models.Index(fields=['status', 'expire_at'], name='task_status_due_idx'),
+            # partial: sent reminders, and those of tasks no longer pending (status 0), drop
+            # out of the index, so it only holds reminders that will be sent. status leads
+            # so the planner prefers it to task_status_due_idx for the due-reminder query.
+            models.Index(fields=['status', 'remind_at'], name='task_reminder_due_idx',
+                         condition=models.Q(reminder_sent_at__isnull=True, status=0)),
+        ]
+        constraints = [
+            # an occurrence is materialized at most once; also the index for finding them
+            models.UniqueConstraint(fields=['recurrence', 'occurrence_at'], name='task_recurrence_occurrence_uniq'),
+        ]
 
     def __str__(self):
         return(f"{self.title}")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        # lets the post_save receiver see status changes made through save()
+        task._saved_status = task.__dict__.get('status')
+        return task
+
+    def save(self, *args, **kwargs):
+        self.schedule_reminder()
+        super().save(*args, **kwargs)
+
+    def schedule_reminder(self):
+        """Recompute remind_at; a reminder that moves is sent again at its new time."""
+        remind_at = None
+        if self.remind_before is not None and self.expire_at:
+            remind_at = self.expire_at - timedelta(minutes=self.remind_before)
+        if remind_at != self.remind_at:
+            self.remind_at = remind_at
+            self.reminder_sent_at = None
+
     def clean(self):
         if self.expire_at and self.expire_at < timezone.now():
-            raise ValidationError("The expiration date must be in the future.")
\ No newline at end of file
+            raise ValidationError("The expiration date must be in the future.")
+
+
+class RecurringTask(models.Model):
+    """A task that repeats; its occurrences are generated on demand, see todo_app.recurrence."""
+    class Frequency(models.IntegerChoices):
+        DAILY = 0, "Daily"
+        WEEKLY = 1, "Weekly"
+        MONTHLY = 2, "Monthly"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_tasks')
+    title = models.TextField(max_length=50)
+    description = models.TextField()
+    frequency = models.PositiveSmallIntegerField(choices=Frequency.choices, default=Frequency.WEEKLY)
+    interval = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)],
+                                                help_text="Repeat every this many days, weeks or months.")
+    starts_at = models.DateTimeField(help_text="Due date of the first occurrence.")
+    ends_at = models.DateTimeField(null=True, blank=True, help_text="No occurrences are due after this.")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'starts_at'], name='recurring_user_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.schedule_label})"
+
+    @property
+    def schedule_label(self):
+        unit = {self.Frequency.DAILY: "day", self.Frequency.WEEKLY: "week", self.Frequency.MONTHLY: "month"}
+        if self.interval == 1:
+            return f"every {unit[self.frequency]}"
+        return f"every {self.interval} {unit[self.frequency]}s"
+
+    def save(self, *args, **kwargs):
+        # occurrences are addressed by whole-second timestamps in URLs
+        if self.starts_at:
+            self.starts_at = self.starts_at.replace(microsecond=0)
+        super().save(*args, **kwargs)
+
+    def clean(self):
+        if self.starts_at and self.starts_at < timezone.now():
+            raise ValidationError("The first due date must be in the future.")
+        if self.starts_at and self.ends_at and self.ends_at < self.starts_at:
+            raise ValidationError("The end date must be after the first due date.")
+
+
+class TaskStats(models.Model):
+    """Per-user task counts, kept up to date by todo_app.stats as tasks change."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='task_stats')
+    total = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    overdue = models.PositiveIntegerField(default=0)
+    # last change to the user's tasks, from any process; the dashboard's validators (see todo_app.caching)
+    modified = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.total} task(s)"
+
+
+class TaskTombstone(models.Model):
+    """Marks a deleted task so delta-sync clients can drop it; see todo_app.sync."""
+    task_id = models.BigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    deleted_at = models.DateTimeField()
+    # copied from a deleted occurrence, so it isn't generated again
+    recurrence = models.ForeignKey(RecurringTask, on_delete=models.SET_NULL, null=True, blank=True,
+                                   db_index=False)
+    occurrence_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+            models.Index(fields=['recurrence', 'occurrence_at'], name='tombstone_occurrence_idx'),
+        ]
+
+    def __str__(self):
+        return f"task {self.task_id} deleted at {self.deleted_at}"
+
+
+class ArchivedTask(models.Model):
+    """
+    Completed tasks moved out of the task table by ``manage.py archive_tasks``.
+
+    Rows keep the id they had as a Task. Only the archived view reads them, so
+    the dashboard's per-user queries never scan them.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.TextField(max_length=50)
+    description = models.TextField()
+    created_at = models.DateTimeField()
+    expire_at = models.DateTimeField()
+    status = models.PositiveSmallIntegerField(choices=Task.Status.choices, default=Task.Status.COMPLETED)
+    user_id = models.ForeignKey(User, on_delete=models.CASCADE)
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'expire_at'], name='archived_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return(f"{self.title}")
@@ -0,0 +1,111 @@
+"""
+Keyset (cursor) pagination for task lists.
+
+Pages are ordered by ``(<sort field>, id)``, ``expire_at`` unless the caller
+picks another field (``-field`` for descending). A cursor encodes the sort
+key of the first or last row of a page, so fetching the next page is an index
+range scan starting at that key instead of an OFFSET that has to walk every
+earlier row. Cursors are only valid for the ordering they were made for.
+"""
+import base64
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+
+DEFAULT_ORDERING = 'expire_at'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(task, ordering=DEFAULT_ORDERING):
+    value = getattr(task, ordering.removeprefix('-'))
+    value = value.isoformat() if hasattr(value, 'isoformat') else value
+    raw = f"{ordering}|{value}|{task.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, model, ordering=DEFAULT_ORDERING):
+    """The ``(sort value, id)`` a cursor for ``ordering`` on ``model`` encodes."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_ordering, rest = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        # rsplit: the value (a title, say) may itself contain "|"
+        value, pk = rest.rsplit("|", 1)
+        if cursor_ordering != ordering:
+            raise ValueError(f"cursor is for {cursor_ordering}")
+        return model._meta.get_field(ordering.removeprefix('-')).to_python(value), int(pk)
+    except (ValueError, UnicodeDecodeError, ValidationError, FieldDoesNotExist) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def get_page_size(value=None):
+    default = getattr(settings, 'TASKS_PAGE_SIZE', 25)
+    maximum = getattr(settings, 'TASKS_MAX_PAGE_SIZE', 100)
+    try:
+        size = int(value) if value else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+class KeysetPage:
+    def __init__(self, items, has_next, has_prev, ordering=DEFAULT_ORDERING):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.ordering = ordering
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.items[-1], self.ordering) if self.has_next and self.items else None
+
+    @property
+    def prev_cursor(self):
+        return encode_cursor(self.items[0], self.ordering) if self.has_prev and self.items else None
+
+
+def _page_query(queryset, after, before, page_size, ordering):
+    """The query for one page, fetching one extra row to tell whether there are more."""
+    field = ordering.removeprefix('-')
+    # walking backwards from ``before`` reverses the page's order
+    ascending = bool(before) == ordering.startswith('-')
+    cursor = before or after
+    if cursor:
+        value, pk = decode_cursor(cursor, queryset.model, ordering)
+        # The ``>=``/``<=`` range keeps the lookup sargable on the
+        # (user_id, <field>) index; the exclude only drops the ties.
+        if ascending:
+            queryset = queryset.filter(**{f'{field}__gte': value}).exclude(**{field: value, 'id__lte': pk})
+        else:
+            queryset = queryset.filter(**{f'{field}__lte': value}).exclude(**{field: value, 'id__gte': pk})
+    order_by = (field, 'id') if ascending else (f'-{field}', '-id')
+    return queryset.order_by(*order_by)[:page_size + 1]
+
+
+def _make_page(rows, after, before, page_size, ordering):
+    if before:
+        items = rows[:page_size]
+        items.reverse()
+        return KeysetPage(items, has_next=True, has_prev=len(rows) > page_size, ordering=ordering)
+    return KeysetPage(rows[:page_size], has_next=len(rows) > page_size, has_prev=bool(after), ordering=ordering)
+
+
+def paginate(queryset, after=None, before=None, page_size=None, ordering=DEFAULT_ORDERING):
+    """
+    Return one KeysetPage of ``queryset`` ordered by (``ordering``, id).
+
+    ``after`` and ``before`` are cursors taken from a previous page; an
+    invalid cursor, or one made for another ordering, raises InvalidCursor.
+    """
+    page_size = get_page_size(page_size)
+    rows = list(_page_query(queryset, after, before, page_size, ordering))
+    return _make_page(rows, after, before, page_size, ordering)
+
+
+async def apaginate(queryset, after=None, before=None, page_size=None, ordering=DEFAULT_ORDERING):
+    """paginate() for async views."""
+    page_size = get_page_size(page_size)
+    rows = [row async for row in _page_query(queryset, after, before, page_size, ordering)]
+    return _make_page(rows, after, before, page_size, ordering)
@@ -0,0 +1,171 @@
+"""
+Recurring tasks, stored as rules rather than as one row per occurrence.
+
+A RecurringTask repeats daily, weekly or monthly every ``interval`` units
+from its first due date ``starts_at`` until ``ends_at`` (if set). Its
+occurrences are computed on demand: occurrences() is a generator over a date
+window that jumps straight to the first occurrence in it, so a rule costs the
+same however long it has been running. The dashboard lists the occurrences
+due in the next RECURRING_WINDOW_DAYS days (upcoming_occurrences()).
+
+An occurrence only becomes a Task row once the user completes or edits it
+(materialize()); the row keeps the rule and the occurrence's original due
+date (``recurrence``, ``occurrence_at``, unique together), which is how the
+generated list leaves it out. Deleting that row leaves a tombstone carrying
+the same two fields (sync.record_tombstones), so the occurrence doesn't come
+back either. Storage therefore grows with the number of rules and of
+occurrences the user has touched, not with how far ahead anyone looks.
+
+Occurrences the user never touched are not kept: once a day has passed, its
+untouched occurrences drop off the dashboard rather than turning overdue.
+
+Steps are taken in the current time zone's wall-clock time, so a daily task
+stays at the same local hour across DST changes, and a monthly task due on
+the 31st falls on the last day of shorter months.
+"""
+import calendar
+import heapq
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import stats
+from .models import RecurringTask, Task, TaskTombstone
+
+# Average length of a step, for estimating how many steps a window is from the start
+AVERAGE_STEP = {
+    RecurringTask.Frequency.DAILY: timedelta(days=1),
+    RecurringTask.Frequency.WEEKLY: timedelta(weeks=1),
+    RecurringTask.Frequency.MONTHLY: timedelta(days=365.2425 / 12),
+}
+
+UPCOMING_LIMIT = 50
+
+
+class Occurrence:
+    """One generated occurrence of a rule; not stored until materialized."""
+
+    def __init__(self, rule, due):
+        self.rule = rule
+        self.due = due
+
+    def __repr__(self):
+        return f"<Occurrence of {self.rule.pk} at {self.due.isoformat()}>"
+
+    def __eq__(self, other):
+        return isinstance(other, Occurrence) and (self.rule.pk, self.due) == (other.rule.pk, other.due)
+
+    @property
+    def title(self):
+        return self.rule.title
+
+    @property
+    def description(self):
+        return self.rule.description
+
+    @property
+    def timestamp(self):
+        """The due date as a Unix timestamp, which identifies the occurrence in URLs."""
+        return int(self.due.timestamp())
+
+
+def nth_occurrence(rule, n):
+    """The due date of the rule's ``n``-th occurrence, counting from 0."""
+    start = timezone.localtime(rule.starts_at)
+    wall = start.replace(tzinfo=None)
+    steps = n * rule.interval
+    if rule.frequency == RecurringTask.Frequency.DAILY:
+        wall += timedelta(days=steps)
+    elif rule.frequency == RecurringTask.Frequency.WEEKLY:
+        wall += timedelta(weeks=steps)
+    else:
+        # from the start every time, so a short month doesn't pull later ones to its last day
+        month = start.month - 1 + steps
+        year = start.year + month // 12
+        month = month % 12 + 1
+        wall = wall.replace(year=year, month=month, day=min(start.day, calendar.monthrange(year, month)[1]))
+    # in UTC, so comparisons and differences are in absolute time
+    return timezone.make_aware(wall, start.tzinfo).astimezone(dt_timezone.utc)
+
+
+def _first_index(rule, start):
+    """The index of the rule's first occurrence due at or after ``start``."""
+    if start <= rule.starts_at:
+        return 0
+    # the estimate is off by a step or two at most (DST, months of different lengths)
+    n = (start - rule.starts_at) // (AVERAGE_STEP[rule.frequency] * rule.interval)
+    while n > 0 and nth_occurrence(rule, n - 1) >= start:
+        n -= 1
+    while nth_occurrence(rule, n) < start:
+        n += 1
+    return n
+
+
+def occurrences(rule, start, end):
+    """Yield the due dates of the rule's occurrences in ``[start, end)``, in order."""
+    n = _first_index(rule, start)
+    while True:
+        due = nth_occurrence(rule, n)
+        if due >= end or (rule.ends_at is not None and due > rule.ends_at):
+            return
+        yield due
+        n += 1
+
+
+def is_occurrence(rule, due):
+    """Whether ``due`` is the due date of one of the rule's occurrences."""
+    return next(occurrences(rule, due, due + timedelta(seconds=1)), None) == due
+
+
+def upcoming_window(today=None):
+    """The dashboard's window: from the start of today for RECURRING_WINDOW_DAYS days."""
+    today = today or timezone.localdate()
+    start = timezone.make_aware(datetime.combine(today, time.min))
+    return start, start + timedelta(days=getattr(settings, 'RECURRING_WINDOW_DAYS', 14))
+
+
+def upcoming_occurrences(user, start, end, limit=UPCOMING_LIMIT):
+    """
+    The first ``limit`` occurrences of the user's rules due in ``[start, end)``, by due date.
+
+    Leaves out occurrences that have been materialized or deleted. Three
+    queries, or one when the user has no rules in the window.
+    """
+    rules = list(RecurringTask.objects.filter(user=user, starts_at__lt=end).exclude(ends_at__lt=start))
+    if not rules:
+        return []
+    taken = set()
+    for model in (Task, TaskTombstone):
+        taken.update(model.objects.filter(recurrence__in=rules, occurrence_at__gte=start, occurrence_at__lt=end)
+                     .values_list('recurrence_id', 'occurrence_at'))
+    # merges the rules' generators lazily: only as many steps as the page needs
+    merged = heapq.merge(*(((due, rule) for due in occurrences(rule, start, end)) for rule in rules),
+                         key=lambda item: (item[0], item[1].pk))
+    return [Occurrence(rule, due) for due, rule in islice(
+        ((due, rule) for due, rule in merged if (rule.pk, due) not in taken), limit)]
+
+
+def materialize(rule, due, status=None):
+    """
+    The Task for the rule's occurrence due at ``due``, and whether it was just created.
+
+    The task is created from the rule, with ``status`` if given, unless the
+    occurrence already has one; that one is moved to ``status`` instead, so
+    completing an occurrence twice (two tabs, a double click) is harmless.
+    Callers invalidate the dashboard: a status change is a queryset update.
+    """
+    with transaction.atomic():
+        task, created = Task.objects.get_or_create(recurrence=rule, occurrence_at=due, defaults={
+            'title': rule.title,
+            'description': rule.description,
+            'expire_at': due,
+            'status': Task.Status.NOT_COMPLETED if status is None else status,
+            'user_id_id': rule.user_id,
+        })
+        if not created and status is not None and task.status != status:
+            stats.set_status(Task.objects.filter(pk=task.pk), rule.user_id, status)
+            task.refresh_from_db()
+    return task, created
@@ -0,0 +1,75 @@
+"""
+Due-date reminder delivery.
+
+Due reminders are read in batches through the partial ``task_reminder_due_idx``
+index and claimed (``reminder_sent_at`` set) before they are sent, so a task is
+never reminded twice, even if the worker is restarted mid-batch. The claim
+only takes reminders that are still unclaimed, and only the rows a worker
+claimed are sent by it, so concurrent workers split a batch instead of both
+sending it. All batches share one mail connection.
+
+If sending a batch fails, its claim is released before the error is raised,
+so the next pass sends it again rather than losing it; messages the mail
+server accepted before the failure are then sent twice.
+"""
+from django.conf import settings
+from django.core.mail import get_connection, send_mass_mail
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task
+
+
+def build_message(task):
+    subject = f"Reminder: {task.title} is due soon"
+    body = (f"Hi {task.user_id.first_name or task.user_id.username},\n\n"
+            f"Your task \"{task.title}\" is due at {timezone.localtime(task.expire_at):%Y-%m-%d %H:%M %Z}.\n\n"
+            f"{task.description}\n")
+    return subject, body, settings.DEFAULT_FROM_EMAIL, [task.user_id.email]
+
+
+def claim_reminders(task_ids, claimed_at):
+    """
+    Mark the still unsent reminders among ``task_ids`` as sent at ``claimed_at``. Returns their tasks.
+
+    The UPDATE holds the write lock until commit, so the rows stamped with
+    ``claimed_at`` are exactly the ones it claimed; rows another worker
+    claimed first are left out.
+    """
+    with transaction.atomic():
+        Task.objects.filter(id__in=task_ids, reminder_sent_at__isnull=True).update(reminder_sent_at=claimed_at)
+        return list(Task.objects.filter(id__in=task_ids, reminder_sent_at=claimed_at).select_related('user_id'))
+
+
+def release_reminders(tasks, claimed_at):
+    """Undo claim_reminders() for ``tasks``, so their reminders are sent on a later pass."""
+    Task.objects.filter(id__in=[task.pk for task in tasks], reminder_sent_at=claimed_at).update(
+        reminder_sent_at=None)
+
+
+def send_due_reminders(now=None, batch_size=None, connection=None):
+    """Send every reminder due by ``now``. Returns the number of emails sent."""
+    now = now or timezone.now()
+    batch_size = batch_size or getattr(settings, 'REMINDER_BATCH_SIZE', 200)
+    connection = connection or get_connection()
+    sent = 0
+    connection.open()
+    try:
+        while True:
+            task_ids = list(Task.objects
+                            .filter(reminder_sent_at__isnull=True, remind_at__lte=now,
+                                    status=Task.Status.NOT_COMPLETED)
+                            .order_by('remind_at')
+                            .values_list('id', flat=True)[:batch_size])
+            if not task_ids:
+                return sent
+            batch = claim_reminders(task_ids, now)
+            datatuple = [build_message(task) for task in batch if task.user_id.email]
+            if datatuple:
+                try:
+                    sent += send_mass_mail(datatuple, fail_silently=False, connection=connection)
+                except Exception:
+                    release_reminders(batch, now)
+                    raise
+    finally:
+        connection.close()
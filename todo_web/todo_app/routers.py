@@ -0,0 +1,121 @@
+"""
+Read/write splitting between the ``default`` database and a ``replica``.
+
+Inside a request handled by ReplicaRoutingMiddleware, reads go to the replica
+and writes to ``default``. A request switches to ``default`` for its reads
+after its first write, and a client whose request wrote something keeps
+reading from ``default`` for REPLICA_PIN_SECONDS, long enough for the replica
+to catch up, so users always see their own changes. The pin is a signed
+cookie carried by the client rather than server state, so it holds whichever
+worker serves the next request; the user's other browsers and devices are
+not pinned and may see the change up to the replication lag later. Unsafe
+methods (POST, ...) read from ``default`` throughout. Session and user lookups, and everything
+outside a request (commands, workers), always use ``default``.
+
+Without a ``replica`` entry in DATABASES everything stays on ``default``.
+"""
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+REPLICA = 'replica'
+
+PIN_COOKIE = 'replica_pin'
+
+_state = ContextVar('todo_db_routing', default=None)
+
+
+def replica_configured():
+    return REPLICA in connections.settings
+
+
+def _pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+def _is_pinned(request, user_id):
+    # holds the user's id, so a pin doesn't carry over to the next user to log in on the client
+    return user_id is not None and request.get_signed_cookie(
+        PIN_COOKIE, default=None, salt=PIN_COOKIE, max_age=_pin_seconds()) == str(user_id)
+
+
+def _pin(response, user_id):
+    response.set_signed_cookie(PIN_COOKIE, str(user_id), salt=PIN_COOKIE, max_age=_pin_seconds(),
+                               secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax')
+
+
+class RoutingState:
+    __slots__ = ('use_primary', 'wrote')
+
+    def __init__(self, use_primary):
+        self.use_primary = use_primary
+        self.wrote = False
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.use_primary or not replica_configured():
+            return 'default'
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.use_primary = True
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica is a copy of default, so objects from either may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Must come after AuthenticationMiddleware: the user is resolved on ``default`` first."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_configured():
+            return self.get_response(request)
+
+        user_id = request.user.pk if request.user.is_authenticated else None
+        pinned = request.method not in ('GET', 'HEAD', 'OPTIONS') or _is_pinned(request, user_id)
+        state = RoutingState(use_primary=pinned)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote and user_id is not None:
+            _pin(response, user_id)
+        return response
+
+    async def __acall__(self, request):
+        if not replica_configured():
+            return await self.get_response(request)
+
+        user_id = await sync_to_async(lambda: request.user.pk if request.user.is_authenticated else None)()
+        pinned = request.method not in ('GET', 'HEAD', 'OPTIONS') or _is_pinned(request, user_id)
+        state = RoutingState(use_primary=pinned)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote and user_id is not None:
+            _pin(response, user_id)
+        return response
@@ -0,0 +1,115 @@
+"""
+Overdue-task sweeper.
+
+The scheduler keeps a bounded min-heap of the next upcoming deadlines so it
+knows how long it can sleep. It never holds the whole table in memory:
+
+* the heap is refilled ``window`` deadlines at a time with an index range scan
+  on (status, expire_at) starting after the latest deadline already loaded;
+* tasks created since the last tick are picked up with a primary-key range
+  scan (``id > last_seen_id``), ``window`` rows at a time and only those
+  pending with a deadline within the heap's horizon;
+* marking tasks overdue is a batched UPDATE over every pending task whose
+  deadline has passed, not just the ones in the heap. Deadlines moved by
+  update_task are therefore still honoured, at the latest after ``max_sleep``.
+
+The scheduler runs in its own process. Its dashboard invalidations reach the
+web workers through the modification stamp on TaskStats (see caching.py), but
+its ``overdue`` events only reach open dashboards if TASK_EVENTS_BROKER is a
+broker shared with them; the default InProcessBroker drops them (see
+events.py).
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .caching import invalidate_dashboard
+from .events import publish_task_event
+from .models import Task
+from .stats import adjust
+
+PENDING = Task.Status.NOT_COMPLETED
+OVERDUE = Task.Status.OVERDUE
+
+
+class DeadlineScheduler:
+    def __init__(self, window=None, batch_size=None, max_sleep=None):
+        self.window = window or getattr(settings, 'SCHEDULER_WINDOW', 10000)
+        self.batch_size = batch_size or getattr(settings, 'SCHEDULER_BATCH_SIZE', 500)
+        self.max_sleep = max_sleep or getattr(settings, 'SCHEDULER_MAX_SLEEP', 60)
+        self.heap = []
+        self.horizon = None
+        self.last_seen_id = Task.objects.aggregate(last=Max('id'))['last'] or 0
+
+    def refill(self, now):
+        start = self.horizon or now
+        deadlines = list(Task.objects
+                         .filter(status=PENDING, expire_at__gt=start)
+                         .order_by('expire_at')
+                         .values_list('expire_at', 'id')[:self.window])
+        for entry in deadlines:
+            heapq.heappush(self.heap, entry)
+        if deadlines:
+            self.horizon = deadlines[-1][0]
+
+    def poll_new_tasks(self):
+        # Pinned first, so rows created while paging are left for the next tick.
+        last_id = Task.objects.aggregate(last=Max('id'))['last'] or 0
+        if self.horizon is None:
+            # Nothing loaded yet: the next refill finds every pending deadline.
+            self.last_seen_id = last_id
+            return
+        while self.last_seen_id < last_id:
+            # Deadlines past the horizon will be loaded by a later refill.
+            new_tasks = list(Task.objects
+                             .filter(id__gt=self.last_seen_id, id__lte=last_id,
+                                     status=PENDING, expire_at__lte=self.horizon)
+                             .order_by('id')
+                             .values_list('id', 'expire_at')[:self.window])
+            for task_id, expire_at in new_tasks:
+                heapq.heappush(self.heap, (expire_at, task_id))
+            self.last_seen_id = new_tasks[-1][0] if len(new_tasks) == self.window else last_id
+
+    def mark_overdue(self, now):
+        """Mark every pending task due by ``now`` as overdue, in batches. Returns the count."""
+        marked = 0
+        while True:
+            due = list(Task.objects
+                       .filter(status=PENDING, expire_at__lte=now)
+                       .order_by('expire_at')
+                       .values_list('id', 'user_id')[:self.batch_size])
+            if not due:
+                return marked
+            due_ids = [task_id for task_id, _ in due]
+            with transaction.atomic():
+                marked += Task.objects.filter(id__in=due_ids, status=PENDING).update(status=OVERDUE,
+                                                                                      updated_at=timezone.now())
+                # The UPDATE holds the write lock until commit, so the overdue rows
+                # among this batch are exactly the ones it just marked.
+                per_user = (Task.objects.filter(id__in=due_ids, status=OVERDUE)
+                            .values_list('user_id').annotate(rows=Count('id')).order_by())
+                for user_id, rows in per_user:
+                    adjust(user_id, {PENDING: -rows, OVERDUE: rows})
+            due_by_user = {}
+            for task_id, user_id in due:
+                due_by_user.setdefault(user_id, []).append(task_id)
+            for user_id, task_ids in due_by_user.items():
+                invalidate_dashboard(user_id)
+                publish_task_event(user_id, 'overdue', ids=task_ids)
+
+    def run_once(self, now=None):
+        """Process one tick. Returns ``(marked, seconds_to_sleep)``."""
+        now = now or timezone.now()
+        self.poll_new_tasks()
+        while self.heap and self.heap[0][0] <= now:
+            heapq.heappop(self.heap)
+        # Only due rows match, so this is cheap even when nothing is due.
+        marked = self.mark_overdue(now)
+        if not self.heap:
+            self.refill(now)
+        wake_at = self.heap[0][0] if self.heap else now + timedelta(seconds=self.max_sleep)
+        return marked, min(max((wake_at - now).total_seconds(), 0), self.max_sleep)
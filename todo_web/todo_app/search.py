@@ -0,0 +1,91 @@
+"""
+Full-text search over task titles and descriptions.
+
+On SQLite the ``todo_app_task_fts`` FTS5 table (created in migration 0012)
+indexes ``title``, ``description`` and the owner id as an external-content
+table over ``todo_app_task``. Searches match the owner column and the query
+terms inside the index, so they never touch other users' rows, and rank by
+bm25 with titles weighted above descriptions.
+
+Triggers keep the index in sync with the task table. Django rebuilds SQLite
+tables when some columns are altered, which drops their triggers, so they are
+(re)created after every migrate by ensure_search_triggers().
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, connections, models
+
+from .models import Task
+
+FTS_TABLE = 'todo_app_task_fts'
+
+TRIGGERS = {
+    'todo_app_task_fts_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS todo_app_task_fts_insert AFTER INSERT ON todo_app_task BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, description, user_id_id)
+            VALUES (new.id, new.title, new.description, new.user_id_id);
+        END""",
+    'todo_app_task_fts_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS todo_app_task_fts_delete AFTER DELETE ON todo_app_task BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, user_id_id)
+            VALUES ('delete', old.id, old.title, old.description, old.user_id_id);
+        END""",
+    'todo_app_task_fts_update': f"""
+        CREATE TRIGGER IF NOT EXISTS todo_app_task_fts_update
+        AFTER UPDATE OF title, description, user_id_id ON todo_app_task BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, user_id_id)
+            VALUES ('delete', old.id, old.title, old.description, old.user_id_id);
+            INSERT INTO {FTS_TABLE}(rowid, title, description, user_id_id)
+            VALUES (new.id, new.title, new.description, new.user_id_id);
+        END""",
+}
+
+# bm25 column weights: title, description, owner
+RANK = f"bm25({FTS_TABLE}, 10.0, 1.0, 0.0)"
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def ensure_search_triggers(using, **kwargs):
+    """post_migrate receiver."""
+    db = connections[using]
+    if db.vendor != 'sqlite' or FTS_TABLE not in db.introspection.table_names():
+        return
+    with db.cursor() as cursor:
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+
+
+def match_expression(user, query):
+    """Build an FTS5 query: every term, as a prefix, within the user's own tasks."""
+    terms = TOKEN_RE.findall(query)
+    if not terms:
+        return None
+    phrases = ' '.join(f'"{term}"*' for term in terms)
+    return f'user_id_id:{int(user.pk)} AND {{title description}}: ({phrases})'
+
+
+def search_tasks(user, query, limit=None):
+    limit = limit or getattr(settings, 'SEARCH_RESULTS_LIMIT', 50)
+    if connection.vendor != 'sqlite':
+        return list(naive_search(user, query)[:limit])
+    match = match_expression(user, query)
+    if match is None:
+        return []
+    return list(Task.objects.raw(
+        f"SELECT todo_app_task.* FROM {FTS_TABLE} "
+        f"JOIN todo_app_task ON todo_app_task.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s ORDER BY {RANK} LIMIT %s",
+        [match, limit]))
+
+
+def naive_search(user, query):
+    """The LIKE scan that FTS replaces; kept as a fallback and as the benchmark baseline."""
+    terms = TOKEN_RE.findall(query)
+    if not terms:
+        return Task.objects.none()
+    tasks = Task.objects.for_user(user)
+    for term in terms:
+        tasks = tasks.filter(models.Q(title__icontains=term) | models.Q(description__icontains=term))
+    return tasks.order_by('expire_at')
@@ -0,0 +1,59 @@
+"""
+Synthetic data for benchmarks and load tests.
+
+Users share one pre-computed password hash and both users and tasks are
+written with bulk_create, so seeding millions of rows costs a few thousand
+INSERTs rather than one round-trip (and one PBKDF2 run) per row.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task
+
+WORDS = ("invoice report meeting groceries dentist deploy review budget garden laundry taxes flight "
+         "hotel birthday gift homework exam refactor backup renew passport insurance doctor gym "
+         "plumber painter contract proposal slides demo release migrate database kitchen").split()
+
+SYLLABLES = "ka lo mi ne ru sa ti vo de pa ge bu fi ho ja ke lu ma no pe".split()
+
+# A few thousand pseudo-words on top of the common ones, so most words only
+# occur in a small share of the tasks, as in real text.
+VOCABULARY = WORDS + [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+
+def seed_username(prefix, index):
+    return f"{prefix}-{index}"
+
+
+def random_task(user, rng, now):
+    return Task(title=" ".join(rng.choices(VOCABULARY, k=3)),
+                description=" ".join(rng.choices(VOCABULARY, k=20)),
+                expire_at=now + timedelta(minutes=rng.randint(1, 60 * 24 * 90)),
+                user_id=user)
+
+
+def seed_users(count, prefix='seed', password='seed-password', batch_size=1000):
+    password_hash = make_password(password)
+    User.objects.bulk_create(
+        (User(username=seed_username(prefix, i), password=password_hash) for i in range(count)),
+        batch_size=batch_size)
+    return list(User.objects.filter(username__in=[seed_username(prefix, i) for i in range(count)]))
+
+
+def seed_tasks(users, tasks_per_user, batch_size=1000, seed=None):
+    """Create ``tasks_per_user`` tasks for every user. Returns the number created."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    created = 0
+    for user in users:
+        for start in range(0, tasks_per_user, batch_size):
+            batch = [random_task(user, rng, now) for _ in range(min(batch_size, tasks_per_user - start))]
+            with transaction.atomic():
+                Task.objects.bulk_create(batch)
+            created += len(batch)
+    return created
@@ -0,0 +1,44 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import stats
+from .backends import user_cache_key
+from .caching import invalidate_dashboard
+from .models import Task
+
+
+# Covers deletes through the ORM (admin, cascades from User, the shell). The
+# views, stats and archiving delete with TaskQuerySet.delete_rows(), a single
+# DELETE that sends no signals, and invalidate the dashboard themselves.
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_owner_dashboard(sender, instance, **kwargs):
+    invalidate_dashboard(instance.user_id_id)
+
+
+@receiver(post_save, sender=Task)
+def count_saved_task(sender, instance, created, **kwargs):
+    saved_status = getattr(instance, '_saved_status', None)
+    if created:
+        stats.record_created(instance.user_id_id, instance.status)
+    elif saved_status is not None and saved_status != instance.status:
+        stats.adjust(instance.user_id_id, {saved_status: -1, instance.status: 1})
+    instance._saved_status = instance.status
+
+
+# Same coverage as above: delete_rows() sends nothing, and its callers count
+# the rows they delete (stats.delete_tasks, archiving).
+@receiver(post_delete, sender=Task)
+def count_deleted_task(sender, instance, origin=None, **kwargs):
+    # deleting the user deletes their counters too; recounting would recreate them
+    if isinstance(origin, User) and origin.pk == instance.user_id_id:
+        return
+    stats.record_deleted(instance.user_id_id, {instance.status: 1})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
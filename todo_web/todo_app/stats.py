@@ -0,0 +1,142 @@
+"""
+Per-user task counters for the dashboard summary.
+
+Every code path that creates tasks, changes their status or deletes them
+reports the change here, and the user's TaskStats row is adjusted with a
+single ``UPDATE ... SET col = col + n``, so concurrent changes never lose
+an increment and reading the summary is one primary-key lookup instead of
+a COUNT over the task table. Rows are created on first use from the task
+table itself; ``manage.py rebuild_task_stats`` recomputes them all.
+"""
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Task, TaskStats
+from .sync import record_tombstones
+
+STATUS_FIELDS = {
+    Task.Status.COMPLETED: 'completed',
+    Task.Status.NOT_COMPLETED: 'pending',
+    Task.Status.OVERDUE: 'overdue',
+}
+
+
+def count_tasks(user_id):
+    """Counts for ``user_id`` straight from the task table."""
+    counts = dict.fromkeys(['total', *STATUS_FIELDS.values()], 0)
+    rows = (Task.objects.filter(user_id=user_id)
+            .values_list('status').annotate(rows=Count('id')).order_by())
+    for status, rows in rows:
+        counts[STATUS_FIELDS[status]] += rows
+        counts['total'] += rows
+    return counts
+
+
+def rebuild_user_stats(user_id):
+    counts = {**count_tasks(user_id), 'modified': timezone.now()}
+    stats, created = TaskStats.objects.get_or_create(user_id=user_id, defaults=counts)
+    if not created:
+        for field, value in counts.items():
+            setattr(stats, field, value)
+        stats.save(update_fields=list(counts))
+    return stats
+
+
+def rebuild_stats(users, batch_size=1000):
+    """
+    Recompute the counters of ``users`` (a User queryset) in batches. Returns the number of users.
+
+    Each batch is one grouped COUNT over the task table and one upsert of the
+    batch's counter rows, in a single transaction.
+    """
+    rebuilt = 0
+    last_id = 0
+    while True:
+        user_ids = list(users.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not user_ids:
+            return rebuilt
+        last_id = user_ids[-1]
+        with transaction.atomic():
+            now = timezone.now()
+            counts = {user_id: TaskStats(user_id=user_id, modified=now) for user_id in user_ids}
+            rows = (Task.objects.filter(user_id__in=user_ids)
+                    .values_list('user_id', 'status').annotate(rows=Count('id')).order_by())
+            for user_id, status, task_rows in rows:
+                stats = counts[user_id]
+                field = STATUS_FIELDS[status]
+                setattr(stats, field, getattr(stats, field) + task_rows)
+                stats.total += task_rows
+            TaskStats.objects.bulk_create(counts.values(), update_conflicts=True, unique_fields=['user'],
+                                          update_fields=['total', *STATUS_FIELDS.values(), 'modified'])
+        rebuilt += len(user_ids)
+
+
+def adjust(user_id, status_deltas):
+    """Apply ``{status: change in rows}`` to the user's counters. Call after the task rows changed."""
+    changes = {}
+    for status, delta in status_deltas.items():
+        if delta:
+            field = STATUS_FIELDS[status]
+            changes[field] = changes.get(field, 0) + delta
+            changes['total'] = changes.get('total', 0) + delta
+    changes = {field: delta for field, delta in changes.items() if delta}
+    if not changes:
+        return
+    updated = TaskStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in changes.items()})
+    if not updated:
+        # no counters yet: the task table already includes this change
+        rebuild_user_stats(user_id)
+
+
+def record_created(user_id, status=Task.Status.NOT_COMPLETED, rows=1):
+    adjust(user_id, {status: rows})
+
+
+def record_status_change(user_id, status, changed):
+    """``changed`` is the ``{old_status: rows}`` returned by TaskQuerySet.set_status()."""
+    deltas = {old_status: -rows for old_status, rows in changed.items()}
+    deltas[status] = deltas.get(status, 0) + sum(changed.values())
+    adjust(user_id, deltas)
+
+
+def record_deleted(user_id, deleted):
+    """``deleted`` is the ``{status: rows}`` returned by TaskQuerySet.delete_by_status()."""
+    adjust(user_id, {status: -rows for status, rows in deleted.items()})
+
+
+def set_status(tasks, user_id, status):
+    """Change the status of ``tasks`` (all owned by ``user_id``) and their owner's counters together."""
+    with transaction.atomic():
+        changed = tasks.set_status(status)
+        record_status_change(user_id, status, changed)
+    return changed
+
+
+def delete_tasks(tasks, user_id):
+    """Delete ``tasks`` (all owned by ``user_id``), leaving sync tombstones and updating the counters."""
+    with transaction.atomic():
+        record_tombstones(tasks)
+        deleted = tasks.delete_by_status()
+        record_deleted(user_id, deleted)
+    return deleted
+
+
+def touch(user_id):
+    """Stamp the user's tasks as changed now, for every process to see. Returns the stamp."""
+    now = timezone.now()
+    TaskStats.objects.filter(user_id=user_id).update(modified=now)
+    return now
+
+
+def get_user_stats(user_id):
+    stats = TaskStats.objects.filter(user_id=user_id).first()
+    return stats if stats is not None else rebuild_user_stats(user_id)
+
+
+async def aget_user_stats(user_id):
+    """get_user_stats() for async views."""
+    stats = await TaskStats.objects.filter(user_id=user_id).afirst()
+    return stats if stats is not None else await sync_to_async(rebuild_user_stats)(user_id)
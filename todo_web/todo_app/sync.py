@@ -0,0 +1,129 @@
+"""
+Delta sync for API clients.
+
+A client keeps the ``sync_token`` from its last response and sends it back
+with the next poll. The response then holds only the tasks created or changed
+since the token (a keyset range scan on the ``(user_id, updated_at)`` index)
+and the ids of tasks deleted since then (from TaskTombstone), so a poll costs
+in proportion to the changes rather than to the size of the task list.
+
+Changes are paged by ``(updated_at, id)``; while ``has_more`` is true the
+client should poll again straight away with the new token. The token of the
+last page lags the server clock by SYNC_GRACE_SECONDS, so rows whose
+transaction committed a little after they were stamped, or that reached a
+read replica late, are still picked up by the next poll. Clients therefore
+see some changes twice and must apply them idempotently.
+
+Tombstones older than SYNC_TOMBSTONE_DAYS are pruned; tokens older than that
+are rejected and the client has to start over with a full sync.
+"""
+import base64
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import DateTimeField, Value
+from django.utils import timezone
+
+from .models import Task, TaskTombstone
+
+SYNC_FIELDS = ('id', 'title', 'description', 'created_at', 'expire_at', 'updated_at', 'status', 'remind_before')
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+class SyncTokenExpired(Exception):
+    pass
+
+
+def encode_token(updated_at, pk):
+    raw = f"{updated_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_token(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        updated_at, pk = raw.split("|")
+        since, pk = datetime.fromisoformat(updated_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidSyncToken(str(exc)) from exc
+    # encode_token() only writes aware datetimes; a naive one can't be compared with them
+    if timezone.is_naive(since):
+        raise InvalidSyncToken(f"Token time has no time zone: {updated_at}")
+    return since, pk
+
+
+def tombstone_cutoff(now):
+    return now - timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 30))
+
+
+def record_tombstones(tasks, deleted_at=None):
+    """
+    Insert a tombstone for each task in ``tasks``; call right before deleting them.
+
+    A single ``INSERT ... SELECT``, so no rows are read into Python and, as the
+    first statement of a transaction, it takes the write lock up front.
+    """
+    deleted_at = deleted_at or timezone.now()
+    rows = (tasks.order_by()
+            .annotate(deleted_at=Value(deleted_at, output_field=DateTimeField()))
+            .values_list('id', 'user_id', 'recurrence', 'occurrence_at', 'deleted_at'))
+    # the SQL selects annotations after fields, whatever order values_list() names them in
+    sql, params = rows.query.sql_with_params()
+    table = connection.ops.quote_name(TaskTombstone._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {table} (task_id, user_id, recurrence_id, occurrence_at, deleted_at) {sql}",
+                       params)
+
+
+def prune_tombstones(now=None):
+    now = now or timezone.now()
+    # a deleted occurrence that is still to come must stay deleted; see todo_app.recurrence
+    deleted, _ = (TaskTombstone.objects.filter(deleted_at__lt=tombstone_cutoff(now))
+                  .exclude(occurrence_at__gte=now).delete())
+    return deleted
+
+
+def serialize_task(row):
+    task = dict(zip(SYNC_FIELDS, row))
+    task['status'] = Task.Status(task['status']).label
+    return task
+
+
+def changes_since(user, token=None, limit=None, now=None):
+    """The sync response for ``user``: changed tasks, deleted ids and the next token."""
+    now = now or timezone.now()
+    limit = limit or getattr(settings, 'SYNC_PAGE_SIZE', 500)
+    tasks = Task.objects.for_user(user)
+    deleted = []
+    since = None
+    if token:
+        since, pk = decode_token(token)
+        if since < tombstone_cutoff(now):
+            raise SyncTokenExpired()
+        # same sargable keyset range as pagination.paginate, on (user_id, updated_at)
+        tasks = tasks.filter(updated_at__gte=since).exclude(updated_at=since, id__lte=pk)
+        deleted = list(TaskTombstone.objects
+                       .filter(user=user, deleted_at__gte=since)
+                       .order_by('deleted_at')
+                       .values_list('task_id', flat=True))
+
+    rows = list(tasks.order_by('updated_at', 'id').values_list(*SYNC_FIELDS)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more:
+        last = rows[-1]
+        next_key = (last[SYNC_FIELDS.index('updated_at')], last[0])
+    else:
+        next_key = (now - timedelta(seconds=getattr(settings, 'SYNC_GRACE_SECONDS', 10)), 0)
+        if token and (since, pk) > next_key:
+            next_key = (since, pk)
+    return {
+        'changed': [serialize_task(row) for row in rows],
+        'deleted': deleted,
+        'has_more': has_more,
+        'sync_token': encode_token(*next_key),
+    }
@@ -1,12 +1,49 @@
-from datetime import datetime, timedelta
+import asyncio
+import csv
+import io
+import itertools
+import json
+import os
+import smtplib
+import sqlite3
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+from unittest import mock
+from datetime import datetime, timedelta, timezone as dt_timezone
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
-from .models import Task
+from .auth_pool import get_executor, run_in_auth_pool
+from .caching import dashboard_cache_stats, get_upcoming_occurrences, invalidate_dashboard
+from .events import RESYNC, InProcessBroker, event_stream
+from .filtering import SORTS, apply_filters
+from .metrics import registry
+from .pagination import encode_cursor, paginate
+from .models import ArchivedTask, RecurringTask, Task, TaskStats, TaskTombstone
+from .recurrence import nth_occurrence, occurrences, upcoming_occurrences, upcoming_window
+from .reminders import claim_reminders, send_due_reminders
+from .routers import PrimaryReplicaRouter, ReplicaRoutingMiddleware
+from .scheduler import DeadlineScheduler
+from .search import search_tasks
+from .sync import changes_since, decode_token, encode_token, prune_tombstones
+from .throttling import login_retry_after, record_login_failure
 from .forms import ScheduleTaskForm, SignUpForm
 
 
@@ -64,6 +101,7 @@ class TestScheduleTask(TestCase):
 
 class TestGetTask(TestCase):
     def setUp(self):
+        cache.clear()
         # create a user
         test_user3 = User.objects.create_user(username='testuser3', password='3HJ1vRV0Z&3iD')
         test_user3.save()
@@ -174,7 +212,16 @@ class TestUpdateTask(TestCase):
         })
         self.assertEqual(response.status_code, 200)
         self.assertTrue('task' in response.context)
-        self.assertEqual(response.context['task'].status, "Completed")
+        self.assertEqual(response.context['task'].status, Task.Status.COMPLETED)
+
+    def test_mark_status_validates_value(self):
+        self.client.login(username='testuser3', password='3HJ1vRV0Z&3iD')
+        url = reverse('mark_task', kwargs={'pk': self.test_task3.pk})
+        self.assertEqual(self.client.post(url, {'new_status': 'Done'}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'new_status': Task.Status.OVERDUE.value}).status_code, 400)
+        response = self.client.post(url, {'new_status': Task.Status.COMPLETED.value})
+        self.assertEqual(response.context['task'].status, Task.Status.COMPLETED)
+        self.assertContains(response, "<strong>Status:</strong> Completed")
 
     def test_invalid_task(self):
         self.client.login(username='testuser3', password='3HJ1vRV0Z&3iD')
@@ -287,3 +334,1622 @@ class TestUserAuthentication(TestCase):
         form = SignUpForm(data=form_data)
         self.assertFalse(form.is_valid())
         self.assertFalse(form.is_valid())
+
+
+class TestDashboardPagination(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='pager', password='7HJ1vRV0Z&3iD')
+        due = timezone.now() + timedelta(days=1)
+        # two tasks share every due date so the id tie-breaker is exercised
+        for i in range(10):
+            Task.objects.create(title=f"Task {i}", description="paged",
+                                expire_at=due + timedelta(hours=i // 2), user_id=self.user)
+        self.expected = list(Task.objects.filter(user_id=self.user).order_by('expire_at', 'id'))
+        self.client.force_login(self.user)
+
+    def test_first_page(self):
+        response = self.client.get(reverse('dashboard'), {'page_size': 4})
+        self.assertEqual(response.context['tasks'], self.expected[:4])
+        self.assertTrue(response.context['page'].has_next)
+        self.assertIsNone(response.context['page'].prev_cursor)
+
+    def test_walk_forward_and_back(self):
+        seen = []
+        params = {'page_size': 4}
+        while True:
+            page = self.client.get(reverse('dashboard'), params).context['page']
+            seen.extend(page.items)
+            if not page.next_cursor:
+                break
+            params = {'page_size': 4, 'after': page.next_cursor}
+        self.assertEqual(seen, self.expected)
+
+        response = self.client.get(reverse('dashboard'), {'page_size': 4, 'before': page.prev_cursor})
+        self.assertEqual(response.context['tasks'], self.expected[4:8])
+        self.assertTrue(response.context['page'].has_prev)
+
+    def test_page_size_is_capped(self):
+        with self.settings(TASKS_MAX_PAGE_SIZE=3):
+            response = self.client.get(reverse('dashboard'), {'page_size': 50})
+        self.assertEqual(len(response.context['tasks']), 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('dashboard'), {'after': 'not-a-cursor'})
+        self.assertRedirects(response, reverse('dashboard'))
+
+
+class TestDashboardFilters(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='sorter', password='7HJ1vRV0Z&3iD')
+        now = timezone.now()
+        for i, (title, status, days) in enumerate([("b", Task.Status.NOT_COMPLETED, 3),
+                                                   ("d", Task.Status.COMPLETED, 1),
+                                                   ("a", Task.Status.NOT_COMPLETED, -2),
+                                                   ("c", Task.Status.OVERDUE, -1),
+                                                   ("a", Task.Status.COMPLETED, -3)]):
+            Task.objects.create(title=title, description="sorted", expire_at=now + timedelta(days=days),
+                                status=status, user_id=self.user)
+        self.client.force_login(self.user)
+
+    def titles(self, **params):
+        return [task.title for task in self.client.get(reverse('dashboard'), params).context['tasks']]
+
+    def test_filters(self):
+        self.assertEqual(self.titles(status='Completed'), ["a", "d"])
+        self.assertEqual(self.titles(status=Task.Status.NOT_COMPLETED.value), ["a", "b"])
+        self.assertEqual(self.titles(overdue='1'), ["a", "c"])
+        tomorrow = (timezone.now() + timedelta(days=1)).date()
+        self.assertEqual(self.titles(due_after=str(tomorrow)), ["d", "b"])
+        self.assertEqual(self.titles(due_before=str(tomorrow), status='Completed'), ["a", "d"])
+        self.assertContains(self.client.get(reverse('dashboard'), {'status': 'Completed', 'overdue': '1'}),
+                            "No tasks match these filters.")
+
+    def test_overdue_filter_moves_on_every_minute(self):
+        start = timezone.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+        Task.objects.create(title="e", description="sorted", expire_at=start + timedelta(seconds=30),
+                            user_id=self.user)
+        with mock.patch('django.utils.timezone.now', return_value=start + timedelta(seconds=40)):
+            response = self.client.get(reverse('dashboard'), {'overdue': '1'})
+            self.assertEqual([task.title for task in response.context['tasks']], ["a", "c"])
+            # cached and unchanged within the minute
+            self.assertEqual(self.client.get(reverse('dashboard'), {'overdue': '1'},
+                                             HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        with mock.patch('django.utils.timezone.now', return_value=start + timedelta(minutes=1)):
+            response = self.client.get(reverse('dashboard'), {'overdue': '1'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task.title for task in response.context['tasks']], ["a", "c", "e"])
+
+    def test_sorts(self):
+        self.assertEqual(self.titles(sort='title'), ["a", "a", "b", "c", "d"])
+        self.assertEqual(self.titles(sort='-due'), ["b", "d", "c", "a", "a"])
+        self.assertEqual(self.titles(sort='-created'), ["a", "c", "a", "d", "b"])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({'sort': 'description'}, {'sort': 'user_id'}, {'status': 'Done'}, {'due_after': 'soon'}):
+            self.assertEqual(self.client.get(reverse('dashboard'), params).status_code, 400)
+
+    def test_cursors_follow_the_sort_and_filters(self):
+        for sort in ('title', '-title', '-created'):
+            expected = self.titles(sort=sort, page_size=100)
+            seen, params = [], {'sort': sort, 'page_size': 2}
+            while True:
+                response = self.client.get(reverse('dashboard'), params)
+                seen += [task.title for task in response.context['tasks']]
+                page = response.context['page']
+                if not page.next_cursor:
+                    break
+                self.assertIn(f'sort={sort}', response.context['list_query'])
+                params = {'sort': sort, 'page_size': 2, 'after': page.next_cursor}
+            self.assertEqual(seen, expected)
+            back = self.client.get(reverse('dashboard'), {'sort': sort, 'page_size': 2, 'before': page.prev_cursor})
+            self.assertEqual([task.title for task in back.context['tasks']], expected[2:4])
+
+        # a cursor only means something for the ordering it was made for
+        cursor = self.client.get(reverse('dashboard'), {'sort': 'title', 'page_size': 2}).context['page'].next_cursor
+        response = self.client.get(reverse('dashboard'), {'sort': 'created', 'after': cursor})
+        self.assertRedirects(response, reverse('dashboard'))
+
+    def test_every_combination_uses_an_index(self):
+        # The plans come from SQLite's EXPLAIN QUERY PLAN of the page query.
+        # Each combination must search an index, never "SCAN todo_app_task";
+        # only a due-date range combined with another sort may sort its
+        # matches in a temp B-tree.
+        now = timezone.now()
+        filters = {
+            'none': {},
+            'status': {'status': Task.Status.NOT_COMPLETED},
+            'due': {'due_after': now, 'due_before': now + timedelta(days=7)},
+            'overdue': {'overdue': now},
+            'status+due': {'status': Task.Status.COMPLETED, 'due_after': now},
+        }
+        due_range = {'due', 'overdue', 'status+due'}
+        first = Task.objects.for_user(self.user).first()
+        for (name, applied), field in itertools.product(filters.items(), SORTS.values()):
+            for ordering, cursor in itertools.product((field, f'-{field}'), (None, first)):
+                tasks = apply_filters(Task.objects.for_user(self.user), applied)
+                with CaptureQueriesContext(connection) as queries:
+                    paginate(tasks, after=cursor and encode_cursor(cursor, ordering), ordering=ordering)
+                with connection.cursor() as explain:
+                    explain.execute(f"EXPLAIN QUERY PLAN {queries[-1]['sql']}")
+                    plan = "\n".join(row[-1] for row in explain.fetchall())
+                with self.subTest(filters=name, ordering=ordering, cursor=bool(cursor), plan=plan):
+                    self.assertIn('USING INDEX', plan)
+                    self.assertNotRegex(plan, r'SCAN todo_app_task(?! USING)')
+                    if name not in due_range or field == 'expire_at':
+                        self.assertNotIn('USE TEMP B-TREE', plan)
+
+
+class TestTaskIndexes(TestCase):
+    # The plans are checked against SQLite's EXPLAIN QUERY PLAN output: a
+    # "SCAN todo_app_task" line without an index means a full table scan.
+    def setUp(self):
+        self.user = User.objects.create_user(username='indexed', password='8HJ1vRV0Z&3iD')
+        other = User.objects.create_user(username='other', password='9HJ1vRV0Z&3iD')
+        due = timezone.now() + timedelta(days=1)
+        Task.objects.bulk_create([
+            Task(title=f"Task {i}", description="indexed", expire_at=due + timedelta(minutes=i),
+                 user_id=self.user if i % 2 else other)
+            for i in range(50)
+        ])
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotRegex(plan, r'SCAN todo_app_task(?! USING)')
+        self.assertNotIn('USE TEMP B-TREE', plan)
+
+    def test_dashboard_page_uses_due_index(self):
+        tasks = Task.objects.filter(user_id=self.user).order_by('expire_at', 'id')[:26]
+        self.assertUsesIndex(tasks, 'task_user_due_idx')
+
+        cursor = tasks[10]
+        deep_page = (Task.objects.filter(user_id=self.user, expire_at__gte=cursor.expire_at)
+                     .exclude(expire_at=cursor.expire_at, id__lte=cursor.pk)
+                     .order_by('expire_at', 'id')[:26])
+        self.assertUsesIndex(deep_page, 'task_user_due_idx')
+        self.assertIn('expire_at>?', deep_page.explain().replace(' ', ''))
+
+    def test_dashboard_status_filter_uses_status_index(self):
+        tasks = Task.objects.filter(user_id=self.user, status=Task.Status.NOT_COMPLETED).order_by('expire_at', 'id')
+        self.assertUsesIndex(tasks, 'task_user_status_due_idx')
+
+    def test_recent_tasks_use_created_index(self):
+        tasks = Task.objects.filter(user_id=self.user).order_by('-created_at')
+        self.assertUsesIndex(tasks, 'task_user_created_idx')
+
+    def test_sync_poll_uses_updated_index(self):
+        since = timezone.now() - timedelta(minutes=5)
+        tasks = (Task.objects.filter(user_id=self.user, updated_at__gte=since)
+                 .exclude(updated_at=since, id__lte=10).order_by('updated_at', 'id')[:501])
+        self.assertUsesIndex(tasks, 'task_user_updated_idx')
+
+    def test_task_detail_uses_primary_key(self):
+        task = Task.objects.for_user(self.user).first()
+        plan = Task.objects.for_user(self.user).filter(id=task.pk).explain()
+        self.assertIn('INTEGER PRIMARY KEY', plan)
+
+
+class TestDashboardCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', password='7HJ1vRV0Z&3iD')
+        self.task = Task.objects.create(title="Cached", description="cached",
+                                        expire_at=timezone.now() + timedelta(days=1), user_id=self.user)
+        self.client.force_login(self.user)
+
+    def test_repeat_load_is_served_from_cache(self):
+        self.client.get(reverse('dashboard'))
+        # session and user come from the cache too; only the modification stamp is read
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['tasks'], [self.task])
+        self.assertEqual(dashboard_cache_stats()['hits'], 1)
+        self.assertEqual(dashboard_cache_stats()['misses'], 1)
+
+    def test_writes_invalidate_cache(self):
+        self.client.get(reverse('dashboard'))
+        self.client.post(reverse('mark_task', kwargs={'pk': self.task.pk}), {'new_status': 'Completed'})
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['tasks'][0].status, Task.Status.COMPLETED)
+
+        self.client.post(reverse('update_task', kwargs={'pk': self.task.pk}), {
+            'title': 'Renamed', 'description': 'cached',
+            'expire_at': timezone.now() + timedelta(days=2)})
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['tasks'][0].title, 'Renamed')
+
+        self.client.get(reverse('delete_task', kwargs={'pk': self.task.pk}))
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['tasks'], [])
+
+    def test_orm_deletes_invalidate_cache(self):
+        self.client.get(reverse('dashboard'))
+        Task.objects.get(pk=self.task.pk).delete()
+        self.assertEqual(self.client.get(reverse('dashboard')).context['tasks'], [])
+
+        task = Task.objects.create(title="Again", description="cached",
+                                   expire_at=timezone.now() + timedelta(days=1), user_id=self.user)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['tasks'], [task])
+        Task.objects.filter(pk=task.pk).delete()
+        self.assertEqual(self.client.get(reverse('dashboard')).context['tasks'], [])
+
+    def test_cache_is_per_user(self):
+        self.client.get(reverse('dashboard'))
+        other = User.objects.create_user(username='uncached', password='8HJ1vRV0Z&3iD')
+        self.client.force_login(other)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['tasks'], [])
+
+    def test_stats_require_staff(self):
+        response = self.client.get(reverse('cache_stats'))
+        self.assertEqual(response.status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('cache_stats'))
+        self.assertEqual(response.json()['dashboard']['misses'], 0)
+
+
+class TestExportTasks(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', password='7HJ1vRV0Z&3iD')
+        other = User.objects.create_user(username='bystander', password='8HJ1vRV0Z&3iD')
+        due = timezone.now() + timedelta(days=1)
+        self.first = Task.objects.create(title="First", description="one, with comma",
+                                         expire_at=due, user_id=self.user)
+        self.second = Task.objects.create(title="Second", description="two", status=Task.Status.COMPLETED,
+                                          expire_at=due + timedelta(days=10), user_id=self.user)
+        Task.objects.create(title="Not mine", description="other", expire_at=due, user_id=other)
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_tasks'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_redirect_if_not_logged_in(self):
+        self.client.logout()
+        response = self.client.get(reverse('export_tasks'))
+        self.assertTrue(response.url.startswith('/login'))
+
+    def test_csv_export(self):
+        rows = list(csv.reader(self.export(format='csv').splitlines()))
+        self.assertEqual(rows[0], ['id', 'title', 'description', 'created_at', 'expire_at', 'status'])
+        self.assertEqual([row[1] for row in rows[1:]], ['First', 'Second'])
+        self.assertEqual(rows[1][2], 'one, with comma')
+
+    def test_ndjson_export_with_filters(self):
+        lines = self.export(format='ndjson', status='Completed').splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.second.pk])
+
+        due_before = (self.first.expire_at + timedelta(days=1)).date().isoformat()
+        lines = self.export(format='ndjson', due_before=due_before).splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['First'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(reverse('export_tasks'), {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_tasks'), {'due_after': 'soon'}).status_code, 400)
+
+
+class TestImportTasks(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', password='7HJ1vRV0Z&3iD')
+        self.due = (timezone.now() + timedelta(days=3)).isoformat()
+        self.past = (timezone.now() - timedelta(days=3)).isoformat()
+
+    def test_upload_csv_reports_row_errors(self):
+        self.client.force_login(self.user)
+        content = (f"title,description,expire_at\n"
+                   f"One,first,{self.due}\n"
+                   f"Two,,{self.due}\n"
+                   f"Three,third,{self.past}\n"
+                   f"Four,fourth,{self.due}\n")
+        upload = SimpleUploadedFile("tasks.csv", content.encode(), content_type="text/csv")
+        response = self.client.post(reverse('import_tasks'), {'file': upload})
+
+        result = response.context['result']
+        self.assertEqual(result.created, 2)
+        self.assertEqual([error['line'] for error in result.errors], [3, 4])
+        self.assertIn('description', result.errors[0]['errors'])
+        self.assertEqual(sorted(Task.objects.filter(user_id=self.user).values_list('title', flat=True)),
+                         ['Four', 'One'])
+
+    def test_upload_requires_login(self):
+        response = self.client.get(reverse('import_tasks'))
+        self.assertTrue(response.url.startswith('/login'))
+
+    def test_command_imports_ndjson_in_batches(self):
+        lines = [json.dumps({'title': f'Task {i}', 'description': 'bulk', 'expire_at': self.due})
+                 for i in range(7)]
+        lines.insert(3, '{not json')
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as handle:
+            handle.write("\n".join(lines))
+        self.addCleanup(os.remove, handle.name)
+
+        out, err = io.StringIO(), io.StringIO()
+        # user lookup, then savepoint, one multi-row INSERT, the counter UPDATE and release
+        # per batch; the first batch also creates the user's counter row (5 queries); then
+        # the modification stamp
+        with self.assertNumQueries(19):
+            call_command('import_tasks', handle.name, user='importer', batch_size=3, stdout=out, stderr=err)
+        self.assertEqual(Task.objects.filter(user_id=self.user).count(), 7)
+        self.assertIn('Imported 7 task(s), 1 error(s)', out.getvalue())
+        self.assertIn('line 4', err.getvalue())
+
+
+class TestTaskQueryCounts(TestCase):
+    # setUp warms the session and user caches, so the counts are the views' own queries.
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='counted', password='7HJ1vRV0Z&3iD')
+        self.other = User.objects.create_user(username='intruder', password='8HJ1vRV0Z&3iD')
+        self.task = Task.objects.create(title="Counted", description="counted",
+                                        expire_at=timezone.now() + timedelta(days=1), user_id=self.user)
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))
+
+    def test_user_task(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('task', kwargs={'pk': self.task.pk}))
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_task(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('update_task', kwargs={'pk': self.task.pk}))
+        # the SELECT, the UPDATE, the modification stamp
+        with self.assertNumQueries(3):
+            self.client.post(reverse('update_task', kwargs={'pk': self.task.pk}), {
+                'title': 'Counted again', 'description': 'counted',
+                'expire_at': timezone.now() + timedelta(days=2)})
+
+    def assert_task_writes_scoped(self, captured, verb):
+        writes = [query['sql'] for query in captured.captured_queries
+                  if query['sql'].startswith(verb) and '"todo_app_task" ' in query['sql']]
+        self.assertTrue(writes)
+        for sql in writes:
+            self.assertIn('"user_id_id" =', sql)
+
+    def test_mark_complete_updates_without_reading_first(self):
+        # savepoint, one UPDATE per other status, the counter UPDATE, release, the modification
+        # stamp, then the SELECT to render
+        with self.assertNumQueries(7) as captured:
+            response = self.client.post(reverse('mark_task', kwargs={'pk': self.task.pk}),
+                                        {'new_status': 'Completed'})
+        self.assertTrue(captured.captured_queries[1]['sql'].startswith('UPDATE'))
+        self.assert_task_writes_scoped(captured, 'UPDATE')
+        self.assertEqual(response.context['task'].status, Task.Status.COMPLETED)
+
+    def test_delete_task_deletes_without_reading_first(self):
+        # savepoint, the tombstone INSERT ... SELECT, one DELETE per status, the counter UPDATE, release,
+        # the modification stamp
+        with self.assertNumQueries(8) as captured:
+            self.client.get(reverse('delete_task', kwargs={'pk': self.task.pk}))
+        self.assertFalse(any(query['sql'].startswith('SELECT') for query in captured.captured_queries))
+        self.assert_task_writes_scoped(captured, 'DELETE')
+        self.assertFalse(Task.objects.filter(pk=self.task.pk).exists())
+
+    def test_other_users_task_is_not_found(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(reverse('update_task', kwargs={'pk': self.task.pk})).status_code, 404)
+        response = self.client.post(reverse('mark_task', kwargs={'pk': self.task.pk}), {'new_status': 'Completed'})
+        self.assertEqual(response.status_code, 404)
+        self.client.get(reverse('delete_task', kwargs={'pk': self.task.pk}))
+        self.assertRedirects(self.client.get(reverse('task', kwargs={'pk': self.task.pk})), reverse('dashboard'))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, Task.Status.NOT_COMPLETED)
+
+
+class TestBulkTasks(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='bulk', password='7HJ1vRV0Z&3iD')
+        other = User.objects.create_user(username='untouched', password='8HJ1vRV0Z&3iD')
+        due = timezone.now() + timedelta(days=1)
+        self.tasks = [Task.objects.create(title=f"Bulk {i}", description="bulk", expire_at=due, user_id=self.user)
+                      for i in range(3)]
+        self.foreign = Task.objects.create(title="Foreign", description="other", expire_at=due, user_id=other)
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))  # warm the session and user caches
+
+    def post(self, action, tasks, **headers):
+        return self.client.post(reverse('bulk_tasks'),
+                                {'action': action, 'task_ids': [task.pk for task in tasks]}, **headers)
+
+    def test_complete_and_reopen(self):
+        # savepoint, one UPDATE per other status, the counter UPDATE, release, the modification stamp
+        with self.assertNumQueries(6):
+            response = self.post('complete', self.tasks[:2] + [self.foreign], HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json(), {'action': 'complete', 'affected': 2})
+        statuses = dict(Task.objects.values_list('title', 'status'))
+        self.assertEqual(statuses, {'Bulk 0': Task.Status.COMPLETED, 'Bulk 1': Task.Status.COMPLETED,
+                                    'Bulk 2': Task.Status.NOT_COMPLETED, 'Foreign': Task.Status.NOT_COMPLETED})
+
+        response = self.post('reopen', self.tasks[:1])
+        self.assertRedirects(response, reverse('dashboard'))
+        self.assertEqual(Task.objects.get(pk=self.tasks[0].pk).status, Task.Status.NOT_COMPLETED)
+
+    def test_delete_only_owned_tasks(self):
+        self.client.get(reverse('dashboard'))
+        response = self.post('delete', self.tasks + [self.foreign], HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['affected'], 3)
+        self.assertEqual(list(Task.objects.all()), [self.foreign])
+        self.assertEqual(self.client.get(reverse('dashboard')).context['tasks'], [])
+
+    def test_invalid_requests(self):
+        self.assertRedirects(self.post('archive', self.tasks), reverse('dashboard'))
+        with self.settings(BULK_MAX_TASKS=2):
+            self.assertEqual(self.post('delete', self.tasks).status_code, 400)
+        self.assertEqual(self.client.post(reverse('bulk_tasks'), {'action': 'delete', 'task_ids': ['x']}).status_code,
+                         400)
+        self.assertEqual(Task.objects.count(), 4)
+
+
+class TestDeadlineScheduler(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sweeper', password='7HJ1vRV0Z&3iD')
+        self.now = timezone.now()
+
+    def make_task(self, minutes, **kwargs):
+        return Task.objects.create(title="Due", description="due", user_id=self.user,
+                                   expire_at=self.now + timedelta(minutes=minutes), **kwargs)
+
+    def test_marks_due_tasks_in_batches(self):
+        for minutes in (-30, -20, -10):
+            self.make_task(minutes)
+        done = self.make_task(-5, status=Task.Status.COMPLETED)
+        upcoming = self.make_task(10)
+
+        scheduler = DeadlineScheduler(batch_size=2, max_sleep=3600)
+        marked, sleep_for = scheduler.run_once(self.now)
+        self.assertEqual(marked, 3)
+        self.assertEqual(Task.objects.filter(status=Task.Status.OVERDUE).count(), 3)
+        self.assertEqual(Task.objects.get(pk=done.pk).status, Task.Status.COMPLETED)
+        self.assertEqual(sleep_for, 600)
+        self.assertEqual(scheduler.heap, [(upcoming.expire_at, upcoming.pk)])
+
+        marked, _ = scheduler.run_once(self.now + timedelta(minutes=11))
+        self.assertEqual(marked, 1)
+        self.assertEqual(Task.objects.get(pk=upcoming.pk).status, Task.Status.OVERDUE)
+
+    def test_heap_is_bounded_by_window(self):
+        for minutes in range(1, 6):
+            self.make_task(minutes)
+        scheduler = DeadlineScheduler(window=2, max_sleep=3600)
+        scheduler.run_once(self.now)
+        self.assertEqual(len(scheduler.heap), 2)
+        scheduler.run_once(self.now + timedelta(minutes=2, seconds=30))
+        self.assertEqual(len(scheduler.heap), 2)
+        self.assertEqual(Task.objects.filter(status=Task.Status.OVERDUE).count(), 2)
+
+    def test_new_and_moved_deadlines(self):
+        later = self.make_task(60)
+        scheduler = DeadlineScheduler(max_sleep=3600)
+        self.assertEqual(scheduler.run_once(self.now)[1], 3600)
+
+        # a task scheduled after startup is picked up without a refill
+        sooner = self.make_task(5)
+        self.assertEqual(scheduler.run_once(self.now)[1], 300)
+
+        # a deadline moved earlier is swept on the next tick
+        Task.objects.filter(pk=later.pk).update(expire_at=self.now + timedelta(minutes=1))
+        marked, _ = scheduler.run_once(self.now + timedelta(minutes=2))
+        self.assertEqual(marked, 1)
+        self.assertEqual(Task.objects.get(pk=sooner.pk).status, Task.Status.NOT_COMPLETED)
+
+    def test_new_tasks_are_polled_in_pages(self):
+        last = self.make_task(60)
+        scheduler = DeadlineScheduler(window=2, max_sleep=3600)
+        scheduler.run_once(self.now)
+        sooner = [self.make_task(minutes) for minutes in (50, 40, 30, 20, 10)]
+        beyond = self.make_task(90)
+        with CaptureQueriesContext(connection) as queries:
+            scheduler.poll_new_tasks()
+        # the last id, then three pages of at most two rows
+        self.assertEqual(len(queries), 4)
+        self.assertTrue(all('LIMIT 2' in query['sql'] for query in queries[1:]))
+        self.assertEqual(sorted(scheduler.heap), [(task.expire_at, task.pk) for task in [*reversed(sooner), last]])
+        self.assertEqual(scheduler.last_seen_id, beyond.pk)
+
+    def test_postponing_overdue_task_reopens_it(self):
+        task = self.make_task(-5, status=Task.Status.OVERDUE)
+        self.client.force_login(self.user)
+        self.client.post(reverse('update_task', kwargs={'pk': task.pk}), {
+            'title': 'Postponed', 'description': 'due', 'expire_at': self.now + timedelta(days=1)})
+        self.assertEqual(Task.objects.get(pk=task.pk).status, Task.Status.NOT_COMPLETED)
+
+
+class TestReminders(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reminded', password='7HJ1vRV0Z&3iD',
+                                             email='reminded@test.com')
+        self.now = timezone.now()
+
+    def make_task(self, due_in, remind_before, **kwargs):
+        return Task.objects.create(title="Remind me", description="soon", user_id=self.user,
+                                   expire_at=self.now + timedelta(minutes=due_in),
+                                   remind_before=remind_before, **kwargs)
+
+    def test_remind_at_follows_due_date(self):
+        task = self.make_task(60, 15)
+        self.assertEqual(task.remind_at, task.expire_at - timedelta(minutes=15))
+        task.reminder_sent_at = self.now
+        task.expire_at += timedelta(hours=1)
+        task.save()
+        self.assertIsNone(task.reminder_sent_at)
+        self.assertIsNone(self.make_task(60, None).remind_at)
+
+    def test_sends_due_reminders_once_over_one_connection(self):
+        due = [self.make_task(10, 30), self.make_task(20, 30), self.make_task(25, 30)]
+        self.make_task(120, 30)
+        self.make_task(10, 30, status=Task.Status.COMPLETED)
+
+        connection = get_connection()
+        with mock.patch.object(connection, 'open', wraps=connection.open) as opened:
+            self.assertEqual(send_due_reminders(now=self.now, batch_size=2, connection=connection), 3)
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].to, ['reminded@test.com'])
+        self.assertEqual(Task.objects.filter(pk__in=[task.pk for task in due], reminder_sent_at=self.now).count(), 3)
+
+        self.assertEqual(send_due_reminders(now=self.now + timedelta(minutes=1)), 0)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_concurrent_workers_send_each_reminder_once(self):
+        tasks = [self.make_task(10, 30), self.make_task(20, 30)]
+        # another worker claims the first task between this worker's SELECT and its claim
+        self.assertEqual(claim_reminders([tasks[0].pk], self.now - timedelta(seconds=1)), [tasks[0]])
+        self.assertEqual(claim_reminders([task.pk for task in tasks], self.now), [tasks[1]])
+        self.assertEqual(send_due_reminders(now=self.now), 0)
+
+    def test_failed_send_releases_the_batch(self):
+        task = self.make_task(10, 30)
+        with mock.patch('todo_app.reminders.send_mass_mail', side_effect=smtplib.SMTPException("down")):
+            with self.assertRaises(smtplib.SMTPException):
+                send_due_reminders(now=self.now)
+        self.assertIsNone(Task.objects.get(pk=task.pk).reminder_sent_at)
+        self.assertEqual(send_due_reminders(now=self.now), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_worker_survives_a_failed_pass(self):
+        self.make_task(10, 30)
+        out = io.StringIO()
+        # the second poll sends the batch the first one released; the second sleep stops the loop
+        with mock.patch('todo_app.reminders.send_mass_mail', side_effect=[smtplib.SMTPException("down"), 1]), \
+                mock.patch('todo_app.management.commands.send_reminders.time.sleep',
+                           side_effect=[None, KeyboardInterrupt]), \
+                self.assertLogs('todo_app.reminders', 'ERROR'), self.assertRaises(KeyboardInterrupt):
+            call_command('send_reminders', stdout=out)
+        self.assertIn("Sent 1 reminder(s)", out.getvalue())
+
+    def test_due_reminder_query_uses_partial_index(self):
+        plan = (Task.objects.filter(reminder_sent_at__isnull=True, remind_at__lte=self.now,
+                                    status=Task.Status.NOT_COMPLETED)
+                .order_by('remind_at').values_list('id', flat=True)[:10].explain())
+        self.assertIn('task_reminder_due_idx (status=? AND remind_at<?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_schedule_form_sets_reminder(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('schedule_task'), {
+            'title': 'With reminder', 'description': 'remind',
+            'expire_at': self.now + timedelta(days=1), 'remind_before': 60})
+        task = Task.objects.get(title='With reminder')
+        self.assertEqual(task.remind_at, task.expire_at - timedelta(hours=1))
+
+
+class TestSearchTasks(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher', password='7HJ1vRV0Z&3iD')
+        other = User.objects.create_user(username='hidden', password='8HJ1vRV0Z&3iD')
+        due = timezone.now() + timedelta(days=1)
+        self.in_title = Task.objects.create(title="Dentist appointment", description="bring card",
+                                            expire_at=due, user_id=self.user)
+        self.in_description = Task.objects.create(title="Errands", description="call the dentist",
+                                                  expire_at=due, user_id=self.user)
+        Task.objects.create(title="Dentist", description="not yours", expire_at=due, user_id=other)
+
+    def test_results_are_ranked_and_scoped(self):
+        self.assertEqual(search_tasks(self.user, 'dentist'), [self.in_title, self.in_description])
+        self.assertEqual(search_tasks(self.user, 'dent'), [self.in_title, self.in_description])
+        self.assertEqual(search_tasks(self.user, 'call dentist'), [self.in_description])
+        self.assertEqual(search_tasks(self.user, '"*):'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.in_title.title = "Orthodontist"
+        self.in_title.save()
+        self.assertEqual(search_tasks(self.user, 'orthodontist'), [self.in_title])
+        self.assertEqual(search_tasks(self.user, 'dentist'), [self.in_description])
+        Task.objects.for_user(self.user).filter(pk=self.in_description.pk).delete()
+        self.assertEqual(search_tasks(self.user, 'dentist'), [])
+
+    def test_search_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('search_tasks'), {'q': 'card'})
+        self.assertEqual(response.context['tasks'], [self.in_title])
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('bench_search', users=2, tasks_per_user=50, queries=5, stdout=out)
+        self.assertIn('Speedup', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='bench-search-').exists())
+
+
+class TestBenchmarkCommands(TestCase):
+    def test_seed_tasks(self):
+        out = io.StringIO()
+        call_command('seed_tasks', users=3, tasks_per_user=25, batch_size=10, prefix='loadtest', stdout=out)
+        self.assertEqual(User.objects.filter(username__startswith='loadtest-').count(), 3)
+        self.assertEqual(Task.objects.filter(user_id__username='loadtest-2').count(), 25)
+        self.assertTrue(self.client.login(username='loadtest-0', password='seed-password'))
+        with self.assertRaises(CommandError):
+            call_command('seed_tasks', users=1, tasks_per_user=1, prefix='loadtest', stdout=out)
+
+    def test_bench_views_reports_json(self):
+        call_command('seed_tasks', users=2, tasks_per_user=5, prefix='bench', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('bench_views', users=2, iterations=2, concurrency=1, prefix='bench', host='testserver',
+                     stdout=out)
+        report = json.loads(out.getvalue())
+        operations = report['operations']
+        self.assertEqual(set(operations), {'login', 'dashboard', 'schedule_task', 'task', 'mark_task', 'delete_task'})
+        self.assertEqual(operations['dashboard']['count'], 4)
+        self.assertEqual(sum(operation['errors'] for operation in operations.values()), 0)
+        self.assertGreater(operations['task']['queries_per_request'], 0)
+        self.assertLessEqual(operations['task']['p50_ms'], operations['task']['p99_ms'])
+        self.assertEqual(Task.objects.count(), 10)
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.user = User.objects.create_user(username='measured', password='7HJ1vRV0Z&3iD')
+        self.task = Task.objects.create(title="Measured", description="measured",
+                                        expire_at=timezone.now() + timedelta(days=1), user_id=self.user)
+        self.client.force_login(self.user)
+
+    def test_records_latency_queries_and_templates_per_view(self):
+        self.client.get(reverse('dashboard'))  # warm the session and user caches
+        self.client.get(reverse('task', kwargs={'pk': self.task.pk}))
+        self.client.get(reverse('task', kwargs={'pk': self.task.pk}))
+        body = self.client.get(reverse('metrics')).content.decode()
+
+        self.assertIn('todo_request_duration_seconds_count{view="task"} 2', body)
+        self.assertIn('todo_request_db_queries_sum{view="task"} 2.000000', body)
+        self.assertIn('todo_request_db_queries_bucket{view="task",le="1"} 2', body)
+        self.assertIn('todo_request_template_duration_seconds_count{view="task"} 2', body)
+        self.assertIn('todo_responses_total{view="task",status="200"} 2', body)
+        self.assertIn('todo_dashboard_cache_requests_total{result="miss"} 1', body)
+
+    def test_template_time_is_measured(self):
+        self.client.get(reverse('task', kwargs={'pk': self.task.pk}))
+        histogram = registry.histograms[('todo_request_template_duration_seconds', 'task')]
+        self.assertGreater(histogram.sum, 0)
+
+    def test_metrics_access(self):
+        with self.settings(METRICS_ALLOWED_IPS=[]):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+            self.user.is_staff = True
+            self.user.save()
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_slow_request_log_includes_sql(self):
+        with self.settings(SLOW_REQUEST_THRESHOLD_MS=0):
+            with self.assertLogs('todo_app.slow_requests', level='WARNING') as logs:
+                self.client.get(reverse('task', kwargs={'pk': self.task.pk}))
+        self.assertIn('FROM "todo_app_task"', logs.output[0])
+
+
+class TestSqliteTuning(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_connections(self):
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('cache_size'), settings.SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+
+    def test_lock_benchmark_reports_both_configurations(self):
+        out = io.StringIO()
+        call_command('bench_sqlite_locks', writers=2, readers=2, duration=0.2, rows=100, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report), {'baseline', 'tuned'})
+        self.assertEqual(set(report['tuned']['operations']), {'read', 'write'})
+
+
+@mock.patch('todo_app.routers.replica_configured', return_value=True)
+class TestReplicaRouting(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.user = User.objects.create_user(username='replicated', password='7HJ1vRV0Z&3iD')
+
+    def route(self, method='get', write=False, user=None, cookies=None):
+        """Run a fake view through the middleware and return the aliases it read from."""
+        request = getattr(RequestFactory(), method)('/')
+        request.user = user or self.user
+        request.COOKIES = {name: morsel.value for name, morsel in (cookies or {}).items()}
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(Task))
+            if write:
+                self.router.db_for_write(Task)
+                reads.append(self.router.db_for_read(Task))
+            return HttpResponse()
+
+        self.response = ReplicaRoutingMiddleware(view)(request)
+        return reads
+
+    def test_outside_requests_everything_uses_default(self, configured):
+        self.assertEqual(self.router.db_for_read(Task), 'default')
+        self.assertEqual(self.router.db_for_write(Task), 'default')
+
+    def test_reads_go_to_replica_until_a_write(self, configured):
+        self.assertEqual(self.route(), ['replica'])
+        self.assertEqual(self.route(write=True), ['replica', 'default'])
+
+    def test_user_reads_primary_after_own_write(self, configured):
+        self.route(method='post', write=True)
+        pin = self.response.cookies
+        # the pin travels with the client, so any worker reading the next request honours it
+        cache.clear()
+        self.assertEqual(self.route(cookies=pin), ['default'])
+        self.assertEqual(self.route(), ['replica'])
+        other = User.objects.create_user(username='not-pinned', password='8HJ1vRV0Z&3iD')
+        self.assertEqual(self.route(user=other, cookies=pin), ['replica'])
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 60):  # pin expired
+            self.assertEqual(self.route(cookies=pin), ['replica'])
+
+    def test_unsafe_methods_read_primary(self, configured):
+        self.assertEqual(self.route(method='post'), ['default'])
+
+    def test_deletes_go_to_default(self, configured):
+        task = Task.objects.create(title="Gone", description="from default", user_id=self.user,
+                                   expire_at=timezone.now())
+
+        def view(request):
+            # reads are on the (unconfigured) replica here, so a read connection would fail
+            Task.objects.filter(pk=task.pk).delete_rows()
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.user = self.user
+        ReplicaRoutingMiddleware(view)(request)
+        self.assertFalse(Task.objects.filter(pk=task.pk).exists())
+
+    def test_sync_replica_copies_database(self, configured):
+        with tempfile.TemporaryDirectory() as directory:
+            source, target = os.path.join(directory, 'primary.sqlite3'), os.path.join(directory, 'replica.sqlite3')
+            primary = sqlite3.connect(source)
+            primary.execute("CREATE TABLE task (id INTEGER PRIMARY KEY, title TEXT)")
+            primary.execute("INSERT INTO task (title) VALUES ('replicated')")
+            primary.commit()
+            primary.close()
+
+            call_command('sync_replica', source=source, target=target, stdout=io.StringIO())
+            replica = sqlite3.connect(target)
+            self.assertEqual(replica.execute("SELECT title FROM task").fetchall(), [('replicated',)])
+            replica.close()
+
+
+class TestSessionQueryCounts(TestCase):
+    """Queries on a warm dashboard load, before and after the session/auth changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='sessioned', password='7HJ1vRV0Z&3iD')
+        Task.objects.create(title="Hot path", description="hot", expire_at=timezone.now() + timedelta(days=1),
+                            user_id=self.user)
+
+    def warm_dashboard_queries(self, backend):
+        self.client.force_login(self.user, backend=backend)
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.context['tasks']), 1)
+        return len(queries)
+
+    def test_db_sessions_and_uncached_user(self):
+        with self.settings(SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            self.assertEqual(self.warm_dashboard_queries('django.contrib.auth.backends.ModelBackend'), 3)
+
+    # the one query left is the dashboard's modification stamp
+    def test_cached_db_sessions_and_cached_user(self):
+        self.assertEqual(self.warm_dashboard_queries('todo_app.backends.CachedModelBackend'), 1)
+
+    def test_signed_cookie_sessions_and_cached_user(self):
+        with self.settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies'):
+            self.assertEqual(self.warm_dashboard_queries('todo_app.backends.CachedModelBackend'), 1)
+
+    def test_messages_do_not_touch_the_session(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('delete_task', kwargs={'pk': 999}))
+        self.assertFalse([query for query in queries.captured_queries if 'django_session' in query['sql']])
+        self.assertIn('messages', response.cookies)
+
+    def test_saving_user_drops_cached_copy(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))
+        self.user.first_name = "Renamed"
+        self.user.save()
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['user'].first_name, "Renamed")
+
+
+class TestTaskStats(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='counter', password='7HJ1vRV0Z&3iD')
+        self.client.force_login(self.user)
+
+    def counts(self):
+        stats = TaskStats.objects.get(user=self.user)
+        return stats.total, stats.completed, stats.pending, stats.overdue
+
+    def schedule(self, title, days=1):
+        self.client.post(reverse('schedule_task'), {'title': title, 'description': "counted",
+                                                    'expire_at': timezone.now() + timedelta(days=days)})
+        return Task.objects.get(title=title)
+
+    def test_views_keep_counters_in_step(self):
+        first, second, third = (self.schedule(title) for title in ("One", "Two", "Three"))
+        self.assertEqual(self.counts(), (3, 0, 3, 0))
+
+        self.client.post(reverse('mark_task', kwargs={'pk': first.pk}), {'new_status': 'Completed'})
+        self.client.post(reverse('mark_task', kwargs={'pk': first.pk}), {'new_status': 'Completed'})
+        self.assertEqual(self.counts(), (3, 1, 2, 0))
+
+        self.client.post(reverse('bulk_tasks'), {'action': 'complete', 'task_ids': [first.pk, second.pk]})
+        self.assertEqual(self.counts(), (3, 2, 1, 0))
+
+        Task.objects.filter(pk=third.pk).update(expire_at=timezone.now() - timedelta(minutes=1))
+        DeadlineScheduler().mark_overdue(timezone.now())
+        self.assertEqual(self.counts(), (3, 2, 0, 1))
+        self.client.post(reverse('update_task', kwargs={'pk': third.pk}), {
+            'title': "Three", 'description': "moved", 'expire_at': timezone.now() + timedelta(days=3)})
+        self.assertEqual(Task.objects.get(pk=third.pk).status, Task.Status.NOT_COMPLETED)
+        self.assertEqual(self.counts(), (3, 2, 1, 0))
+
+        self.client.get(reverse('delete_task', kwargs={'pk': first.pk}))
+        self.client.post(reverse('bulk_tasks'), {'action': 'delete', 'task_ids': [second.pk]})
+        self.assertEqual(self.counts(), (1, 0, 1, 0))
+
+    def test_scheduler_and_import_update_counters(self):
+        task = self.schedule("Late")
+        Task.objects.filter(pk=task.pk).update(expire_at=timezone.now() - timedelta(minutes=1))
+        DeadlineScheduler().mark_overdue(timezone.now())
+        self.assertEqual(self.counts(), (1, 0, 0, 1))
+
+        upload = SimpleUploadedFile("tasks.csv", (
+            "title,description,expire_at\n"
+            f"Imported,row,{(timezone.now() + timedelta(days=1)).isoformat()}\n").encode())
+        self.client.post(reverse('import_tasks'), {'file': upload})
+        self.assertEqual(self.counts(), (2, 0, 1, 1))
+
+    def test_orm_deletes_update_counters(self):
+        first, second, third = (self.schedule(title) for title in ("One", "Two", "Three"))
+        self.client.post(reverse('mark_task', kwargs={'pk': first.pk}), {'new_status': 'Completed'})
+        Task.objects.get(pk=first.pk).delete()
+        self.assertEqual(self.counts(), (2, 0, 2, 0))
+        Task.objects.filter(pk__in=[second.pk, third.pk]).delete()
+        self.assertEqual(self.counts(), (0, 0, 0, 0))
+
+        # a user's tasks go with them, and so do their counters
+        self.schedule("Four")
+        self.user.delete()
+        self.assertFalse(TaskStats.objects.exists())
+
+    def test_dashboard_summary_is_cached_with_the_page(self):
+        self.schedule("Shown")
+        self.client.get(reverse('dashboard'))
+        with self.assertNumQueries(1):  # the modification stamp
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['summary'], {'total': 1, 'completed': 0, 'pending': 1, 'overdue': 0})
+        self.assertContains(response, "1 pending")
+
+    def test_rebuild_command_fixes_drift(self):
+        self.schedule("Real")
+        other = User.objects.create_user(username='no-tasks', password='8HJ1vRV0Z&3iD')
+        TaskStats.objects.filter(user=self.user).update(total=40, pending=40)
+        out = io.StringIO()
+        call_command('rebuild_task_stats', batch_size=1, stdout=out)
+        self.assertIn('Rebuilt task counters for 2 user(s)', out.getvalue())
+        self.assertEqual(self.counts(), (1, 0, 1, 0))
+        self.assertEqual(TaskStats.objects.get(user=other).total, 0)
+
+
+class TestStatusCodesMigration(TransactionTestCase):
+    before = [('todo_app', '0013_task_stats')]
+    after = [('todo_app', '0015_alter_task_status')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_labels_become_codes(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        old_apps = self.migrate(self.before)
+        OldTask = old_apps.get_model('todo_app', 'Task')
+        OldUser = old_apps.get_model('auth', 'User')
+        user = OldUser.objects.create(username='legacy')
+        due = timezone.now() + timedelta(days=1)
+        for status in ('Completed', 'Not Completed', 'Overdue', 'Completed'):
+            OldTask.objects.create(title=status, description="legacy", expire_at=due, status=status, user_id=user)
+
+        new_apps = self.migrate(self.after)
+        NewTask = new_apps.get_model('todo_app', 'Task')
+        self.assertEqual(sorted(NewTask.objects.values_list('status', flat=True)), [0, 1, 1, 2])
+
+        self.migrate(self.before)
+        self.assertEqual(sorted(OldTask.objects.values_list('status', flat=True)),
+                         ['Completed', 'Completed', 'Not Completed', 'Overdue'])
+
+    def test_legacy_values_become_codes(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        old_apps = self.migrate(self.before)
+        OldTask = old_apps.get_model('todo_app', 'Task')
+        user = old_apps.get_model('auth', 'User').objects.create(username='legacy')
+        due = timezone.now() + timedelta(days=1)
+        for status in ('D', 'ND', 'Done', 'Not Done', '1'):
+            OldTask.objects.create(title=status, description="legacy", expire_at=due, status=status, user_id=user)
+
+        NewTask = self.migrate(self.after).get_model('todo_app', 'Task')
+        self.assertEqual(dict(NewTask.objects.values_list('title', 'status')),
+                         {'D': 1, 'ND': 0, 'Done': 1, 'Not Done': 0, '1': 1})
+
+    def test_unknown_values_stop_the_migration(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        old_apps = self.migrate(self.before)
+        OldTask = old_apps.get_model('todo_app', 'Task')
+        user = old_apps.get_model('auth', 'User').objects.create(username='legacy')
+        task = OldTask.objects.create(title="Odd", description="legacy", expire_at=timezone.now(),
+                                      status='Maybe', user_id=user)
+        self.addCleanup(task.delete)
+        with self.assertRaisesMessage(ValueError, "unknown status values ['Maybe']"):
+            self.migrate(self.after)
+
+
+class TestArchiveTasks(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='archivist', password='7HJ1vRV0Z&3iD')
+        self.other = User.objects.create_user(username='keeper', password='8HJ1vRV0Z&3iD')
+        now = timezone.now()
+        self.old_done = [Task.objects.create(title=f"Old {i}", description="done", status=Task.Status.COMPLETED,
+                                             expire_at=now - timedelta(days=60 + i), user_id=self.user)
+                         for i in range(5)]
+        self.other_done = Task.objects.create(title="Other old", description="done", status=Task.Status.COMPLETED,
+                                              expire_at=now - timedelta(days=90), user_id=self.other)
+        self.recent_done = Task.objects.create(title="Recent", description="done", status=Task.Status.COMPLETED,
+                                               expire_at=now - timedelta(days=2), user_id=self.user)
+        self.old_open = Task.objects.create(title="Old open", description="open", status=Task.Status.OVERDUE,
+                                            expire_at=now - timedelta(days=60), user_id=self.user)
+
+    def test_command_moves_old_completed_tasks_in_batches(self):
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('archive_tasks', older_than=30, batch_size=2, stdout=out)
+        self.assertIn('Archived 6 task(s)', out.getvalue())
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if query['sql'].startswith('INSERT INTO "todo_app_archivedtask"')]), 3)
+
+        self.assertEqual(set(Task.objects.values_list('title', flat=True)), {"Recent", "Old open"})
+        archived = ArchivedTask.objects.get(pk=self.old_done[0].pk)
+        self.assertEqual((archived.title, archived.user_id, archived.status),
+                         ("Old 0", self.user, Task.Status.COMPLETED))
+        self.assertEqual(archived.created_at, self.old_done[0].created_at)
+        self.assertEqual(ArchivedTask.objects.count(), 6)
+        self.assertEqual(TaskStats.objects.get(user=self.user).completed, 1)
+        self.assertEqual(TaskStats.objects.get(user=self.other).total, 0)
+
+    def test_archived_view_lists_only_own_tasks(self):
+        call_command('archive_tasks', older_than=30, stdout=io.StringIO())
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('archived_tasks'))
+        self.assertEqual([task.title for task in response.context['tasks']],
+                         [f"Old {i}" for i in range(4, -1, -1)])
+        self.assertNotContains(response, "Other old")
+        dashboard = self.client.get(reverse('dashboard'))
+        self.assertEqual({task.title for task in dashboard.context['tasks']}, {"Recent", "Old open"})
+
+    def test_archived_view_requires_login(self):
+        self.assertRedirects(self.client.get(reverse('archived_tasks')), reverse('login'))
+
+
+@override_settings(SYNC_GRACE_SECONDS=0)
+class TestDeltaSync(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='syncer', password='7HJ1vRV0Z&3iD')
+        other = User.objects.create_user(username='unsynced', password='8HJ1vRV0Z&3iD')
+        due = timezone.now() + timedelta(days=1)
+        self.tasks = [Task.objects.create(title=f"Sync {i}", description="sync", expire_at=due, user_id=self.user)
+                      for i in range(3)]
+        Task.objects.create(title="Foreign", description="other", expire_at=due, user_id=other)
+        self.client.force_login(self.user)
+
+    def sync(self, token=None):
+        response = self.client.get(reverse('sync_tasks'), {'since': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_initial_sync_then_only_changes(self):
+        first = self.sync()
+        self.assertEqual([task['title'] for task in first['changed']], ["Sync 0", "Sync 1", "Sync 2"])
+        self.assertEqual(first['changed'][0]['status'], "Not Completed")
+        self.assertEqual((first['deleted'], first['has_more']), ([], False))
+
+        with self.assertNumQueries(2):  # changed tasks, tombstones
+            self.assertEqual(self.sync(first['sync_token'])['changed'], [])
+
+        self.client.post(reverse('mark_task', kwargs={'pk': self.tasks[0].pk}),
+                         {'new_status': Task.Status.COMPLETED.value})
+        self.client.get(reverse('delete_task', kwargs={'pk': self.tasks[1].pk}))
+        created = Task.objects.create(title="Sync new", description="sync",
+                                      expire_at=timezone.now() + timedelta(days=2), user_id=self.user)
+        second = self.sync(first['sync_token'])
+        self.assertEqual([(task['id'], task['status']) for task in second['changed']],
+                         [(self.tasks[0].pk, "Completed"), (created.pk, "Not Completed")])
+        self.assertEqual(second['deleted'], [self.tasks[1].pk])
+
+    def test_bulk_delete_and_scheduler_are_synced(self):
+        token = self.sync()['sync_token']
+        self.client.post(reverse('bulk_tasks'), {'action': 'delete', 'task_ids': [self.tasks[0].pk, 999]})
+        Task.objects.filter(pk=self.tasks[2].pk).update(expire_at=timezone.now() - timedelta(minutes=1))
+        DeadlineScheduler().mark_overdue(timezone.now())
+        changes = self.sync(token)
+        self.assertEqual(changes['deleted'], [self.tasks[0].pk])
+        self.assertEqual([(task['id'], task['status']) for task in changes['changed']],
+                         [(self.tasks[2].pk, "Overdue")])
+        self.assertEqual(TaskTombstone.objects.count(), 1)
+
+    def test_changes_are_paged(self):
+        first = changes_since(self.user, limit=2)
+        self.assertTrue(first['has_more'])
+        rest = changes_since(self.user, first['sync_token'], limit=2)
+        self.assertFalse(rest['has_more'])
+        self.assertEqual([task['title'] for task in first['changed'] + rest['changed']],
+                         ["Sync 0", "Sync 1", "Sync 2"])
+
+    @override_settings(SYNC_GRACE_SECONDS=30)
+    def test_final_token_lags_the_clock(self):
+        now = timezone.now()
+        token = changes_since(self.user, now=now)['sync_token']
+        self.assertEqual(decode_token(token), (now - timedelta(seconds=30), 0))
+        # recent changes are sent again rather than risk missing a late commit
+        self.assertEqual(len(changes_since(self.user, token, now=now)['changed']), 3)
+
+    def test_bad_and_expired_tokens(self):
+        response = self.client.get(reverse('sync_tasks'), {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, 400)
+        naive = encode_token(timezone.now().replace(tzinfo=None), 0)
+        self.assertEqual(self.client.get(reverse('sync_tasks'), {'since': naive}).status_code, 400)
+        expired = encode_token(timezone.now() - timedelta(days=365), 0)
+        self.assertEqual(self.client.get(reverse('sync_tasks'), {'since': expired}).status_code, 410)
+
+    def test_prune_tombstones(self):
+        TaskTombstone.objects.create(task_id=1, user=self.user, deleted_at=timezone.now() - timedelta(days=90))
+        TaskTombstone.objects.create(task_id=2, user=self.user, deleted_at=timezone.now())
+        out = io.StringIO()
+        call_command('prune_tombstones', stdout=out)
+        self.assertIn("Pruned 1 tombstone(s)", out.getvalue())
+        self.assertEqual(list(TaskTombstone.objects.values_list('task_id', flat=True)), [2])
+
+
+class RecordingBroker:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, user_id, event):
+        self.published.append((user_id, event))
+
+
+class TestTaskEvents(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='streamer', password='7HJ1vRV0Z&3iD')
+        self.client.force_login(self.user)
+        self.broker = RecordingBroker()
+        patcher = mock.patch('todo_app.events.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_write_views_publish_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('schedule_task'), {'title': "Live", 'description': "event",
+                                                        'expire_at': timezone.now() + timedelta(days=1)})
+        task = Task.objects.get(title="Live")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('mark_task', kwargs={'pk': task.pk}), {'new_status': Task.Status.COMPLETED.value})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('delete_task', kwargs={'pk': task.pk}))
+        self.assertEqual([(user_id, event['type']) for user_id, event in self.broker.published],
+                         [(self.user.pk, 'task.created'), (self.user.pk, 'task.completed'),
+                          (self.user.pk, 'task.deleted')])
+        self.assertEqual(self.broker.published[1][1]['task']['status'], "Completed")
+        self.assertEqual(self.broker.published[2][1]['ids'], [task.pk])
+
+    def test_no_event_when_nothing_changed(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post(reverse('bulk_tasks'), {'action': 'delete', 'task_ids': [1]})
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.broker.published, [])
+
+
+class TestEventStream(TestCase):
+    def collect(self, stream, frames):
+        async def run():
+            received = []
+            async for frame in stream:
+                received.append(frame)
+                if len(received) == frames:
+                    break
+            await stream.aclose()
+            return received
+        return run()
+
+    def test_broker_delivers_to_open_streams_of_the_owner_only(self):
+        broker = InProcessBroker()
+
+        async def scenario():
+            mine, theirs = broker.subscribe(1), broker.subscribe(2)
+            # published from another thread, as the sync views do
+            await asyncio.get_running_loop().run_in_executor(None, broker.publish, 1, {'type': 'task.created'})
+            event = await asyncio.wait_for(mine.get(), timeout=1)
+            self.assertTrue(theirs.queue.empty())
+            mine.close()
+            theirs.close()
+            return event
+
+        self.assertEqual(asyncio.run(scenario()), {'type': 'task.created'})
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_slow_subscriber_gets_resync(self):
+        broker = InProcessBroker()
+
+        async def scenario():
+            with self.settings(SSE_QUEUE_SIZE=2):
+                subscription = broker.subscribe(1)
+            for i in range(5):
+                subscription.deliver({'type': 'task.updated', 'n': i})
+            return [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+
+        # the oldest event makes room for the resync marker; later events are dropped
+        self.assertEqual(asyncio.run(scenario()), [{'type': 'task.updated', 'n': 1}, RESYNC])
+
+    def test_stream_frames_keepalives_and_timeout(self):
+        broker = InProcessBroker()
+
+        async def scenario():
+            stream = event_stream(7, keepalive=0.01, max_seconds=0.2)
+            frames = [await stream.__anext__()]
+            broker.publish(7, {'type': 'task.deleted', 'ids': [3]})
+            frames.append(await stream.__anext__())
+            frames.append(await stream.__anext__())
+            frames += [frame async for frame in stream]
+            return frames
+
+        with mock.patch('todo_app.events.get_broker', return_value=broker):
+            frames = asyncio.run(scenario())
+        self.assertTrue(frames[0].startswith('retry: '))
+        self.assertEqual(frames[1], 'event: task.deleted\ndata: {"type": "task.deleted", "ids": [3]}\n\n')
+        self.assertEqual(frames[2], ': keepalive\n\n')
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    @override_settings(ROOT_URLCONF='todo_web.asgi_urls')
+    async def test_endpoint_streams_over_asgi(self):
+        response = await self.async_client.get(reverse('task_events'))
+        self.assertEqual(response.status_code, 403)
+
+        user = await sync_to_async(User.objects.create_user)(username='asgi', password='7HJ1vRV0Z&3iD')
+        await sync_to_async(self.async_client.force_login)(user)
+        self.assertContains(await self.async_client.get(reverse('dashboard')), 'new EventSource')
+        response = await self.async_client.get(reverse('task_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = await self.collect(response.streaming_content, 1)
+        self.assertTrue(frames[0].startswith(b'retry: '))
+
+    def test_no_stream_under_wsgi(self):
+        self.client.force_login(User.objects.create_user(username='wsgi', password='7HJ1vRV0Z&3iD'))
+        self.assertNotContains(self.client.get(reverse('dashboard')), 'EventSource')
+        response = self.client.get(reverse('task_events'))
+        # EventSource gives up on a 204 instead of reconnecting
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+
+class TestConditionalGet(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='revalidator', password='7HJ1vRV0Z&3iD')
+        self.task = Task.objects.create(title="Cached", description="conditional",
+                                        expire_at=timezone.now() + timedelta(days=1), user_id=self.user)
+        self.client.force_login(self.user)
+
+    def test_unchanged_dashboard_is_not_rendered_again(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+
+        with self.assertNumQueries(1), self.assertTemplateNotUsed('dashboard.html'):
+            response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(reverse('dashboard'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        self.client.post(reverse('mark_task', kwargs={'pk': self.task.pk}),
+                         {'new_status': Task.Status.COMPLETED.value})
+        response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_writes_from_other_processes_change_the_dashboard(self):
+        etag = self.client.get(reverse('dashboard'))['ETag']
+        # as the scheduler does in its own process, with its own cache
+        Task.objects.filter(pk=self.task.pk).update(status=Task.Status.OVERDUE)
+        with mock.patch('todo_app.caching.cache.incr'), mock.patch('todo_app.caching.cache.set'):
+            invalidate_dashboard(self.user.pk)
+        response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['tasks'][0].status, Task.Status.OVERDUE)
+
+    def test_workers_agree_on_the_dashboard_etag(self):
+        etag = self.client.get(reverse('dashboard'))['ETag']
+        cache.clear()  # another worker, with a cache of its own
+        response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_sent_reminder_changes_the_task_page(self):
+        response = self.client.get(reverse('task', kwargs={'pk': self.task.pk}))
+        Task.objects.filter(pk=self.task.pk).update(reminder_sent_at=timezone.now() + timedelta(seconds=5))
+        response = self.client.get(reverse('task', kwargs={'pk': self.task.pk}),
+                                   HTTP_IF_NONE_MATCH=response['ETag'],
+                                   HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_pending_messages_are_rendered(self):
+        etag = self.client.get(reverse('dashboard'))['ETag']
+        self.client.get(reverse('login'))  # "You are already logged in", then back to the dashboard
+        response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "You are already logged in")
+
+    def test_task_page_follows_updated_at(self):
+        url = reverse('task', kwargs={'pk': self.task.pk})
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with self.assertNumQueries(1), self.assertTemplateNotUsed('task.html'):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.client.post(reverse('update_task', kwargs={'pk': self.task.pk}), {
+            'title': "Renamed", 'description': "conditional", 'expire_at': self.task.expire_at,
+            'status': Task.Status.NOT_COMPLETED.value})
+        self.assertContains(self.client.get(url, HTTP_IF_NONE_MATCH=etag), "Renamed")
+
+    def test_access_is_checked_first(self):
+        url = reverse('task', kwargs={'pk': self.task.pk})
+        etag = self.client.get(url)['ETag']
+        self.client.logout()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertTrue(response.url.startswith('/login'))
+
+        other = User.objects.create_user(username='other', password='8HJ1vRV0Z&3iD')
+        self.client.force_login(other)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.url, reverse('dashboard'))
+
+
+@override_settings(ROOT_URLCONF='todo_web.asgi_urls')
+class TestAsyncViews(TransactionTestCase):
+    # TransactionTestCase: logins hash passwords on the auth pool's own threads and connections
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.user = User.objects.create_user(username='asyncuser', password='7HJ1vRV0Z&3iD')
+        self.broker = RecordingBroker()
+        patcher = mock.patch('todo_app.events.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_anonymous_users_are_redirected(self):
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith('/login'))
+
+    async def test_login_and_dashboard(self):
+        response = await self.async_client.post(reverse('login'), {'username': 'asyncuser', 'password': 'wrong'})
+        self.assertTrue(response.url.startswith('/login'))
+        response = await self.async_client.post(reverse('login'), {'username': 'asyncuser',
+                                                                   'password': '7HJ1vRV0Z&3iD'})
+        self.assertEqual(response.url, reverse('dashboard'))
+
+        await sync_to_async(Task.objects.create)(title="Async task", description="async",
+                                                 expire_at=timezone.now() + timedelta(days=1), user_id=self.user)
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertTrue(asyncio.iscoroutinefunction(response.resolver_match.func))
+        self.assertContains(response, "Async task")
+        response = await self.async_client.get(reverse('dashboard'), headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        # the metrics middleware still sees the queries an async view runs in other threads
+        self.assertGreater(registry.histograms[('todo_request_db_queries', 'dashboard')].sum, 0)
+
+    async def test_signup_logs_in(self):
+        response = await self.async_client.post(reverse('signup'), {
+            'username': 'asyncsignup', 'first_name': "Async", 'last_name': "Signup", 'email': "a@test.com",
+            'password1': '5iD78788', 'password2': '5iD78788'})
+        self.assertEqual(response.url, reverse('dashboard'))
+        self.assertEqual((await self.async_client.get(reverse('dashboard'))).status_code, 200)
+
+    async def test_task_lifecycle_keeps_counters_and_publishes(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        await self.async_client.post(reverse('schedule_task'), {
+            'title': "Async", 'description': "lifecycle", 'expire_at': timezone.now() + timedelta(days=1)})
+        task = await Task.objects.aget(title="Async")
+        response = await self.async_client.post(reverse('mark_task', kwargs={'pk': task.pk}), {'new_status': 'Overdue'})
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.post(reverse('mark_task', kwargs={'pk': task.pk}),
+                                                {'new_status': Task.Status.COMPLETED.value})
+        self.assertContains(response, "Completed")
+        stats = await TaskStats.objects.aget(user=self.user)
+        self.assertEqual((stats.total, stats.completed), (1, 1))
+
+        await self.async_client.get(reverse('delete_task', kwargs={'pk': task.pk}))
+        self.assertFalse(await Task.objects.filter(pk=task.pk).aexists())
+        stats = await TaskStats.objects.aget(user=self.user)
+        self.assertEqual((stats.total, stats.completed), (0, 0))
+        self.assertEqual([event['type'] for _, event in self.broker.published],
+                         ['task.created', 'task.completed', 'task.deleted'])
+
+    async def test_other_users_tasks_are_not_found(self):
+        other = await sync_to_async(User.objects.create_user)(username='other', password='8HJ1vRV0Z&3iD')
+        task = await Task.objects.acreate(title="Not yours", description="other",
+                                          expire_at=timezone.now() + timedelta(days=1), user_id=other)
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('update_task', kwargs={'pk': task.pk}))
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse('task', kwargs={'pk': task.pk}))
+        self.assertEqual(response.url, reverse('dashboard'))
+
+
+class TestLoginStormBenchmark(TransactionTestCase):
+    def test_reports_both_servers(self):
+        call_command('seed_tasks', users=2, tasks_per_user=3, prefix='storm', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('bench_login_storm', users=2, prefix='storm', logins=3, dashboard_clients=2,
+                     dashboard_requests=2, wsgi_threads=2, host='testserver', stdout=out)
+        report = json.loads(out.getvalue())
+        for server in ('wsgi', 'asgi'):
+            operations = report[server]['operations']
+            self.assertEqual((operations['login']['count'], operations['dashboard']['count']), (3, 4))
+            self.assertEqual(operations['login']['errors'] + operations['dashboard']['errors'], 0)
+
+
+class TestAuthPool(TestCase):
+    def test_runs_on_a_bounded_pool_with_the_callers_context(self):
+        request_id = ContextVar('request_id')
+        lock = threading.Lock()
+        running, peak, names = [0], [0], set()
+
+        def work():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                names.add(threading.current_thread().name)
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return request_id.get()
+
+        async def storm():
+            request_id.set('req-1')
+            return await asyncio.gather(*(run_in_auth_pool(work) for _ in range(4 * settings.AUTH_POOL_SIZE)))
+
+        self.assertEqual(set(asyncio.run(storm())), {'req-1'})
+        self.assertLessEqual(peak[0], settings.AUTH_POOL_SIZE)
+        self.assertTrue(all(name.startswith('todo-auth') for name in names))
+        self.assertIs(get_executor(), get_executor())
+
+
+@override_settings(LOGIN_FAILURES_PER_USERNAME=3, LOGIN_FAILURES_PER_IP=5, LOGIN_LOCKOUT_SECONDS=600)
+class TestLoginThrottling(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='guarded', password='7HJ1vRV0Z&3iD')
+        self.factory = RequestFactory()
+
+    def login(self, username, password, ip='10.0.0.1'):
+        return self.client.post(reverse('login'), {'username': username, 'password': password}, REMOTE_ADDR=ip)
+
+    def test_throttled_logins_never_reach_the_hasher(self):
+        with mock.patch.object(PBKDF2PasswordHasher, 'verify', autospec=True,
+                               side_effect=PBKDF2PasswordHasher.verify) as verify:
+            for _ in range(3):
+                self.assertTrue(self.login('guarded', 'wrong').url.startswith('/login'))
+            self.assertEqual(verify.call_count, 3)
+
+            # locked out: even the right password is rejected without hashing
+            response = self.login('guarded', '7HJ1vRV0Z&3iD')
+            self.assertEqual(response.status_code, 429)
+            self.assertGreater(int(response['Retry-After']), 590)
+            self.assertEqual(verify.call_count, 3)
+            self.assertNotIn('_auth_user_id', self.client.session)
+
+            # the lockout is per username: other users on other IPs are unaffected
+            User.objects.create_user(username='bystander', password='8HJ1vRV0Z&3iD')
+            self.assertEqual(self.login('bystander', '8HJ1vRV0Z&3iD', ip='10.0.0.2').url, reverse('dashboard'))
+
+    def test_ip_limit_spans_usernames(self):
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode', autospec=True,
+                               side_effect=PBKDF2PasswordHasher.encode) as encode:
+            for i in range(5):
+                self.login(f'nobody{i}', 'wrong')
+            # unknown usernames are hashed too (ModelBackend's timing defence)
+            self.assertEqual(encode.call_count, 5)
+            self.assertEqual(self.login('nobody9', 'wrong').status_code, 429)
+            self.assertEqual(encode.call_count, 5)
+        self.assertEqual(self.login('nobody9', 'wrong', ip='10.0.0.2').status_code, 302)
+
+    def test_success_clears_username_failures(self):
+        for _ in range(2):
+            self.login('guarded', 'wrong')
+        self.assertEqual(self.login('guarded', '7HJ1vRV0Z&3iD').url, reverse('dashboard'))
+        self.client.logout()
+        for _ in range(2):
+            self.login('guarded', 'wrong')
+        self.assertNotEqual(self.login('guarded', 'wrong').status_code, 429)
+
+    def test_sliding_window(self):
+        request = self.factory.post(reverse('login'), REMOTE_ADDR='10.0.0.3')
+        with self.settings(LOGIN_LOCKOUT_SECONDS=0, LOGIN_FAILURE_WINDOW_SECONDS=100), \
+                mock.patch('todo_app.throttling.time.time') as now:
+            now.return_value = 1050.0
+            for _ in range(3):
+                record_login_failure(request, 'Guarded')
+            # usernames are case-insensitive
+            self.assertEqual(login_retry_after(request, 'guarded'), 50)
+            # 20% into the next window, 80% of the previous window's failures still count
+            now.return_value = 1120.0
+            self.assertEqual(login_retry_after(request, 'guarded'), 0)
+            record_login_failure(request, 'guarded')
+            self.assertEqual(login_retry_after(request, 'guarded'), 80)
+            now.return_value = 1150.0
+            self.assertEqual(login_retry_after(request, 'guarded'), 0)
+
+    @override_settings(ROOT_URLCONF='todo_web.asgi_urls')
+    async def test_async_login_is_throttled(self):
+        request = self.factory.post(reverse('login'), REMOTE_ADDR='127.0.0.1')
+        for _ in range(3):
+            await sync_to_async(record_login_failure)(request, 'guarded')
+        with mock.patch('todo_app.async_views.run_in_auth_pool') as pool:
+            response = await self.async_client.post(reverse('login'), {'username': 'guarded',
+                                                                       'password': '7HJ1vRV0Z&3iD'})
+        self.assertEqual(response.status_code, 429)
+        pool.assert_not_called()
+
+
+class TestRecurringTasks(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='repeater', password='7HJ1vRV0Z&3iD')
+        self.client.force_login(self.user)
+        self.start = timezone.now().replace(microsecond=0) + timedelta(hours=1)
+        self.rule = RecurringTask.objects.create(user=self.user, title="Water plants", description="all of them",
+                                                 frequency=RecurringTask.Frequency.DAILY, starts_at=self.start)
+
+    def rule_at(self, starts_at, frequency, interval=1, ends_at=None):
+        return RecurringTask(user=self.user, title="Rule", description="rule", frequency=frequency,
+                             interval=interval, starts_at=starts_at, ends_at=ends_at)
+
+    def occurrence_url(self, name, due, rule=None):
+        return reverse(name, kwargs={'pk': (rule or self.rule).pk, 'timestamp': int(due.timestamp())})
+
+    def upcoming(self):
+        return upcoming_occurrences(self.user, *upcoming_window())
+
+    def test_occurrences(self):
+        utc = dt_timezone.utc
+        weekly = self.rule_at(datetime(2030, 1, 7, 9, tzinfo=utc), RecurringTask.Frequency.WEEKLY, interval=2,
+                              ends_at=datetime(2030, 2, 4, 9, tzinfo=utc))
+        self.assertEqual([due.day for due in occurrences(weekly, weekly.starts_at, datetime(2031, 1, 1, tzinfo=utc))],
+                         [7, 21, 4])
+        # month ends are clamped, and later months go back to the 31st
+        monthly = self.rule_at(datetime(2030, 1, 31, 9, tzinfo=utc), RecurringTask.Frequency.MONTHLY)
+        self.assertEqual([(due.month, due.day) for due in occurrences(
+            monthly, datetime(2030, 2, 1, tzinfo=utc), datetime(2030, 5, 1, tzinfo=utc))],
+            [(2, 28), (3, 31), (4, 30)])
+
+    def test_window_far_from_start_is_reached_directly(self):
+        daily = self.rule_at(datetime(2000, 1, 1, 9, tzinfo=dt_timezone.utc), RecurringTask.Frequency.DAILY)
+        start = datetime(2030, 6, 15, tzinfo=dt_timezone.utc)
+        with mock.patch('todo_app.recurrence.nth_occurrence', wraps=nth_occurrence) as nth:
+            dues = list(occurrences(daily, start, start + timedelta(days=3)))
+        self.assertEqual(dues, [start + timedelta(days=day, hours=9) for day in range(3)])
+        self.assertLess(nth.call_count, 10)
+
+    def test_daily_occurrences_keep_their_local_time_across_dst(self):
+        with timezone.override('Europe/Berlin'):
+            rule = self.rule_at(timezone.make_aware(datetime(2030, 3, 29, 9)), RecurringTask.Frequency.DAILY)
+            dues = list(occurrences(rule, rule.starts_at, rule.starts_at + timedelta(days=3)))
+            self.assertEqual([timezone.localtime(due).hour for due in dues], [9, 9, 9])
+            self.assertEqual([dues[1] - dues[0], dues[2] - dues[1]], [timedelta(hours=24), timedelta(hours=23)])
+
+    def test_dashboard_lists_occurrences_without_storing_them(self):
+        response = self.client.get(reverse('dashboard'))
+        upcoming = response.context['upcoming']
+        self.assertEqual(upcoming[0].due, self.start)
+        self.assertGreaterEqual(len(upcoming), settings.RECURRING_WINDOW_DAYS - 1)
+        self.assertContains(response, self.occurrence_url('complete_occurrence', self.start))
+        self.assertFalse(Task.objects.exists())
+
+    def test_complete_materializes_the_occurrence_once(self):
+        url = self.occurrence_url('complete_occurrence', self.start)
+        self.assertRedirects(self.client.post(url), reverse('dashboard'))
+        self.client.post(url)
+        task = Task.objects.get()
+        self.assertEqual((task.recurrence, task.occurrence_at, task.expire_at, task.status),
+                         (self.rule, self.start, self.start, Task.Status.COMPLETED))
+        self.assertEqual(TaskStats.objects.get(user=self.user).completed, 1)
+        upcoming = self.client.get(reverse('dashboard')).context['upcoming']
+        self.assertEqual(upcoming[0].due, self.start + timedelta(days=1))
+
+    def test_edit_materializes_and_opens_the_task(self):
+        due = self.start + timedelta(days=2)
+        response = self.client.post(self.occurrence_url('edit_occurrence', due))
+        task = Task.objects.get()
+        self.assertRedirects(response, reverse('update_task', kwargs={'pk': task.pk}))
+        self.assertEqual((task.title, task.status), ("Water plants", Task.Status.NOT_COMPLETED))
+        self.client.post(reverse('update_task', kwargs={'pk': task.pk}), {
+            'title': 'Water plants', 'description': 'just the fern', 'expire_at': due + timedelta(hours=2)})
+        self.assertNotIn(due, [occurrence.due for occurrence in self.upcoming()])
+
+    def test_deleted_occurrence_is_not_generated_again(self):
+        due = self.start + timedelta(days=1)
+        self.client.post(self.occurrence_url('edit_occurrence', due))
+        self.client.get(reverse('delete_task', kwargs={'pk': Task.objects.get().pk}))
+        self.assertNotIn(due, [occurrence.due for occurrence in self.upcoming()])
+        # pruning keeps tombstones of occurrences still to come
+        prune_tombstones(timezone.now() + timedelta(days=settings.SYNC_TOMBSTONE_DAYS + 1) - timedelta(days=2))
+        self.assertTrue(TaskTombstone.objects.filter(recurrence=self.rule, occurrence_at=due).exists())
+
+    def test_only_the_owners_real_occurrences_are_found(self):
+        self.assertEqual(self.client.post(self.occurrence_url(
+            'complete_occurrence', self.start + timedelta(minutes=1))).status_code, 404)
+        self.client.force_login(User.objects.create_user(username='other', password='8HJ1vRV0Z&3iD'))
+        self.assertEqual(self.client.post(self.occurrence_url('complete_occurrence', self.start)).status_code, 404)
+        self.assertFalse(Task.objects.exists())
+
+    def test_schedule_and_stop(self):
+        starts_at = timezone.localtime(self.start + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M')
+        response = self.client.post(reverse('schedule_recurring'), {
+            'title': 'Rent', 'description': 'pay it', 'frequency': RecurringTask.Frequency.MONTHLY,
+            'interval': 1, 'starts_at': starts_at})
+        self.assertRedirects(response, reverse('dashboard'))
+        rent = RecurringTask.objects.get(title='Rent')
+        self.assertEqual(rent.schedule_label, "every month")
+        self.assertIn('Rent', [occurrence.title for occurrence in self.upcoming()])
+
+        self.client.post(self.occurrence_url('complete_occurrence', self.start))
+        self.client.post(reverse('delete_recurring', kwargs={'pk': self.rule.pk}))
+        self.assertEqual([occurrence.title for occurrence in self.upcoming()], ['Rent'])
+        # occurrences that have a row are kept as ordinary tasks
+        self.assertIsNone(Task.objects.get().recurrence)
+
+    def test_upcoming_queries(self):
+        # rules, then the materialized and the deleted occurrences in the window; cached with the dashboard
+        with self.assertNumQueries(3):
+            get_upcoming_occurrences(self.user, timezone.localdate())
+        with self.assertNumQueries(0):
+            get_upcoming_occurrences(self.user, timezone.localdate())
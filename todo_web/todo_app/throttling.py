@@ -0,0 +1,148 @@
+"""
+Login throttling, so repeated bad guesses stop costing a password hash each.
+
+Failed logins are counted per username and per client IP in a sliding window
+of LOGIN_FAILURE_WINDOW_SECONDS, kept in the cache as two fixed-window
+counters (the current window and the previous one, weighted by how much of
+it still overlaps the sliding window). A username or IP that reaches its
+limit (LOGIN_FAILURES_PER_USERNAME, LOGIN_FAILURES_PER_IP) is locked out for
+LOGIN_LOCKOUT_SECONDS, and the login views reject its requests before
+calling authenticate(). A successful login clears the username's failures.
+
+The client IP is REMOTE_ADDR: behind a proxy, have it set REMOTE_ADDR to the
+real client address or every client will share one counter. Counters live
+in the default cache, so they are shared between workers only if the cache is.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _limits():
+    return {
+        'username': getattr(settings, 'LOGIN_FAILURES_PER_USERNAME', 5),
+        'ip': getattr(settings, 'LOGIN_FAILURES_PER_IP', 50),
+    }
+
+
+def _scopes(request, username):
+    """(scope, key part) pairs a login attempt is counted under."""
+    # hashed: usernames are user input and may not be valid cache keys
+    digest = hashlib.sha256(username.strip().lower().encode()).hexdigest()[:32]
+    return [('username', digest), ('ip', request.META.get('REMOTE_ADDR', ''))]
+
+
+def _window_keys(scope, ident, now):
+    window = getattr(settings, 'LOGIN_FAILURE_WINDOW_SECONDS', 300)
+    index = int(now // window)
+    return (f'login_failures:{scope}:{ident}:{index}',
+            f'login_failures:{scope}:{ident}:{index - 1}',
+            (now % window) / window)
+
+
+def _lock_key(scope, ident):
+    return f'login_lockout:{scope}:{ident}'
+
+
+def _estimate(current, previous, elapsed):
+    """Failures in the sliding window ending now."""
+    return (current or 0) + (previous or 0) * (1 - elapsed)
+
+
+def _lookup_keys(request, username, now):
+    keys = []
+    for scope, ident in _scopes(request, username):
+        current, previous, _ = _window_keys(scope, ident, now)
+        keys += [_lock_key(scope, ident), current, previous]
+    return keys
+
+
+def _retry_after(request, username, values, now):
+    retry_after = 0
+    limits = _limits()
+    for scope, ident in _scopes(request, username):
+        current, previous, elapsed = _window_keys(scope, ident, now)
+        locked_until = values.get(_lock_key(scope, ident))
+        if locked_until is not None:
+            retry_after = max(retry_after, math.ceil(locked_until - now))
+        elif _estimate(values.get(current), values.get(previous), elapsed) >= limits[scope]:
+            # over the limit without a lockout (LOGIN_LOCKOUT_SECONDS = 0): wait for the window to slide
+            retry_after = max(retry_after, math.ceil((1 - elapsed) * getattr(
+                settings, 'LOGIN_FAILURE_WINDOW_SECONDS', 300)))
+    return retry_after
+
+
+def login_retry_after(request, username):
+    """Seconds until ``username`` may try to log in from this client again; 0 if it may now."""
+    now = time.time()
+    return _retry_after(request, username, cache.get_many(_lookup_keys(request, username, now)), now)
+
+
+async def alogin_retry_after(request, username):
+    """login_retry_after() for async views."""
+    now = time.time()
+    return _retry_after(request, username, await cache.aget_many(_lookup_keys(request, username, now)), now)
+
+
+def _incr(key, timeout):
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # expired between add() and incr()
+        cache.set(key, 1, timeout=timeout)
+        return 1
+
+
+async def _aincr(key, timeout):
+    await cache.aadd(key, 0, timeout=timeout)
+    try:
+        return await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, timeout=timeout)
+        return 1
+
+
+def record_login_failure(request, username):
+    now = time.time()
+    window = getattr(settings, 'LOGIN_FAILURE_WINDOW_SECONDS', 300)
+    lockout = getattr(settings, 'LOGIN_LOCKOUT_SECONDS', 900)
+    limits = _limits()
+    for scope, ident in _scopes(request, username):
+        current, previous, elapsed = _window_keys(scope, ident, now)
+        count = _incr(current, 2 * window)
+        if lockout and _estimate(count, cache.get(previous), elapsed) >= limits[scope]:
+            cache.set(_lock_key(scope, ident), now + lockout, timeout=lockout)
+
+
+async def arecord_login_failure(request, username):
+    """record_login_failure() for async views."""
+    now = time.time()
+    window = getattr(settings, 'LOGIN_FAILURE_WINDOW_SECONDS', 300)
+    lockout = getattr(settings, 'LOGIN_LOCKOUT_SECONDS', 900)
+    limits = _limits()
+    for scope, ident in _scopes(request, username):
+        current, previous, elapsed = _window_keys(scope, ident, now)
+        count = await _aincr(current, 2 * window)
+        if lockout and _estimate(count, await cache.aget(previous), elapsed) >= limits[scope]:
+            await cache.aset(_lock_key(scope, ident), now + lockout, timeout=lockout)
+
+
+def _username_keys(request, username):
+    now = time.time()
+    scope, ident = _scopes(request, username)[0]
+    current, previous, _ = _window_keys(scope, ident, now)
+    return [current, previous]
+
+
+def clear_login_failures(request, username):
+    """Forget the username's failures after it logged in; the IP's are kept."""
+    cache.delete_many(_username_keys(request, username))
+
+
+async def aclear_login_failures(request, username):
+    """clear_login_failures() for async views."""
+    await cache.adelete_many(_username_keys(request, username))
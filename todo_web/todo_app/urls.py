@@ -11,5 +11,18 @@ urlpatterns = [
     path('update_task/<int:pk>', views.update_task, name='update_task'),
     path('mark_task/<int:pk>', views.mark_complete, name='mark_task'),
     path('delete_task/<int:pk>', views.delete_task, name='delete_task'),
+    path('schedule_recurring/', views.schedule_recurring, name='schedule_recurring'),
+    path('recurring/<int:pk>/<int:timestamp>/complete', views.complete_occurrence, name='complete_occurrence'),
+    path('recurring/<int:pk>/<int:timestamp>/edit', views.edit_occurrence, name='edit_occurrence'),
+    path('recurring/<int:pk>/delete', views.delete_recurring, name='delete_recurring'),
+    path('bulk_tasks/', views.bulk_tasks, name='bulk_tasks'),
+    path('archived/', views.archived_tasks, name='archived_tasks'),
+    path('sync/', views.sync_tasks, name='sync_tasks'),
+    path('events/', views.task_events, name='task_events'),
+    path('search/', views.search_tasks, name='search_tasks'),
+    path('export_tasks/', views.export_tasks, name='export_tasks'),
+    path('import_tasks/', views.import_tasks, name='import_tasks'),
+    path('metrics', views.metrics, name='metrics'),
+    path('cache_stats/', views.cache_stats, name='cache_stats'),
 
 ]
\ No newline at end of file
@@ -1,12 +1,35 @@
+import csv
+import io
+from datetime import datetime, timezone as dt_timezone
+
 from django.core.exceptions import ObjectDoesNotExist
-from django.http import HttpResponseRedirect, Http404
+from django.conf import settings
+from django.http import HttpResponseRedirect, Http404, JsonResponse, HttpResponseBadRequest, StreamingHttpResponse, \
+    HttpResponse, HttpResponseForbidden
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils import timezone
 
-from .forms import SignUpForm, ScheduleTaskForm
-from .models import Task
+from .forms import SignUpForm, ScheduleTaskForm, RecurringTaskForm, ImportTasksForm
+from . import stats
+from .events import publish_task_event
+from .caching import dashboard_cache_stats, get_dashboard_marker, get_dashboard_page, get_dashboard_summary, \
+    get_upcoming_occurrences, invalidate_dashboard
+from .conditional import add_validators, not_modified, page_etag, task_validators
+from .exporting import EXPORT_FORMATS, stream_csv, stream_ndjson
+from .filtering import FILTER_PARAMS, filter_tasks, parse_filters, parse_sort
+from .importing import guess_format, import_tasks as import_task_rows, read_rows
+from .metrics import registry
+from .models import ArchivedTask, RecurringTask, Task
+from .pagination import InvalidCursor, paginate
+from .recurrence import is_occurrence, materialize, upcoming_window
+from .search import search_tasks as run_search
+from .sync import InvalidSyncToken, SyncTokenExpired, changes_since
+from .throttling import clear_login_failures, login_retry_after, record_login_failure
 
 
 # Create your views here.
@@ -38,13 +61,46 @@ def signup_user(request):
 def dashboard(request):
     if request.user.is_authenticated:
         user = request.user
-        tasks = Task.objects.filter(user_id=user)
-        return render(request, 'dashboard.html', {'tasks': tasks})
+        try:
+            filters = parse_filters(request.GET)
+            ordering = parse_sort(request.GET.get('sort'))
+        except ValueError as exc:
+            return HttpResponseBadRequest(str(exc))
+        # read before the page, so a write racing the render changes the next ETag
+        modified = get_dashboard_marker(user.pk)
+        # the recurring occurrences listed also change at midnight
+        today = timezone.localdate()
+        # and an overdue filter's results every minute (see filtering.py)
+        cutoff = filters.get('overdue')
+        etag = page_etag(request, user.pk, modified, today, cutoff)
+        modified = max(modified, upcoming_window(today)[0].timestamp(), cutoff.timestamp() if cutoff else 0)
+        unchanged = not_modified(request, etag, modified)
+        if unchanged is not None:
+            return unchanged
+        try:
+            page = get_dashboard_page(user, filters,
+                                      after=request.GET.get('after'),
+                                      before=request.GET.get('before'),
+                                      page_size=request.GET.get('page_size'),
+                                      ordering=ordering)
+        except InvalidCursor:
+            return redirect('dashboard')
+        response = render(request, 'dashboard.html', {'tasks': page.items, 'page': page,
+                                                      'summary': get_dashboard_summary(user),
+                                                      'upcoming': get_upcoming_occurrences(user, today),
+                                                      'filtered': bool(filters),
+                                                      'list_query': dashboard_list_query(request.GET)})
+        return add_validators(response, etag, modified)
     else:
         messages.success(request, "You must be logged in to view this page!")
         return redirect('login')
 
 
+def dashboard_list_query(params):
+    """The filter, sort and page size parameters, for links to other pages of the same list."""
+    return urlencode({name: params[name] for name in (*FILTER_PARAMS, 'sort', 'page_size') if params.get(name)})
+
+
 def login_user(request):
     if request.user.is_authenticated:
         messages.success(request, "You are already logged in")
@@ -53,19 +109,32 @@ def login_user(request):
         if request.method == 'POST':
             username = request.POST['username']
             password = request.POST['password']
+            # Checked before authenticate(), so throttled guesses cost no password hash
+            retry_after = login_retry_after(request, username)
+            if retry_after:
+                return login_throttled(request, retry_after)
             # Authenticate
             user = authenticate(request, username=username, password=password)
             if user is not None:
+                clear_login_failures(request, username)
                 login(request, user)
                 messages.success(request, "You have been logged in!")
                 return redirect('dashboard')
             else:
+                record_login_failure(request, username)
                 messages.success(request, "Error logging in. Please try again")
                 return redirect('login')
         else:
             return render(request, 'login.html', {})
 
 
+def login_throttled(request, retry_after):
+    messages.error(request, f"Too many failed logins. Please try again in {retry_after} seconds.")
+    response = render(request, 'login.html', {}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
 def logout_user(request):
     if request.user.is_authenticated:
         logout(request)
@@ -85,9 +154,11 @@ def schedule_task(request):
                     title=form.cleaned_data['title'],
                     description=form.cleaned_data['description'],
                     expire_at=form.cleaned_data['expire_at'],
+                    remind_before=form.cleaned_data['remind_before'],
                     user_id=request.user
                 )
                 add_task.save()
+                publish_task_event(request.user.pk, 'created', task=add_task)
                 messages.success(request, "Task scheduled")
                 return redirect('dashboard')
         return render(request, 'schedule.html', {'form': form})
@@ -99,14 +170,11 @@ def schedule_task(request):
 def user_task(request, pk):
     if request.user.is_authenticated:
         try:
-            task = Task.objects.get(id=pk)
-            if request.user != task.user_id:
-                messages.error(request, "Not authorized to see this task")
-                return redirect('dashboard')
-            else:
-                return render(request, 'task.html', {'task': task})
+            task = Task.objects.for_user(request.user).get(id=pk)
+            etag, modified = task_validators(request, request.user.pk, task)
+            return (not_modified(request, etag, modified)
+                    or add_validators(render(request, 'task.html', {'task': task}), etag, modified))
         except ObjectDoesNotExist:
-            print("nottttt user task found")
             messages.error(request, "Task not found.")
             return redirect('dashboard')
     else:
@@ -116,44 +184,50 @@ def user_task(request, pk):
 
 def update_task(request, pk):
     if request.user.is_authenticated:
-        # Check if the task exists or return a 404 error page if not found
-        task = get_object_or_404(Task, id=pk)
-        if request.user != task.user_id:
-            messages.error(request, "Not authorized to update this task")
-            return redirect('dashboard')
+        # Tasks of other users are indistinguishable from missing ones: 404 either way
+        task = get_object_or_404(Task.objects.for_user(request.user), id=pk)
+        if request.method == 'POST':
+            form = ScheduleTaskForm(request.POST, instance=task)
+            if form.is_valid():
+                task = form.save(commit=False)
+                if task.status == Task.Status.OVERDUE and task.expire_at > timezone.now():
+                    task.status = Task.Status.NOT_COMPLETED
+                task.save()
+                publish_task_event(request.user.pk, 'updated', task=task)
+                messages.success(request, "Task updated successfully!")
+                return redirect('task', pk=pk)
         else:
-            if request.method == 'POST':
-                form = ScheduleTaskForm(request.POST, instance=task)
-                if form.is_valid():
-                    form.save()
-                    messages.success(request, "Task updated successfully!")
-                    return redirect('task', pk=pk)
-            else:
-                form = ScheduleTaskForm(instance=task)
-            return render(request, 'update_task.html', {'form': form, 'task': task})
+            form = ScheduleTaskForm(instance=task)
+        return render(request, 'update_task.html', {'form': form, 'task': task})
     else:
         messages.success(request, "You must be logged in to view this page!")
         return redirect('login')
 
 
+# Overdue is set by the scheduler only.
+MARKABLE_STATUSES = (Task.Status.COMPLETED, Task.Status.NOT_COMPLETED)
+
+
 def mark_complete(request, pk):
     if request.user.is_authenticated:
         if request.method == "POST":
-            new_status = request.POST.get("new_status")
             try:
-                task = Task.objects.get(id=pk)
-                if request.user != task.user_id:
-                    messages.error(request, "Not authorized to update status of this task")
-                    return redirect('dashboard')
-                else:
-                    task.status = new_status
-                    task.save()
-                    messages.success(request, "Task status updated!")
-                    return render(request, 'task.html', {'task': task})
-            except ObjectDoesNotExist:
-                print("nottttt mark complete found")
+                new_status = Task.Status.parse(request.POST.get("new_status"))
+            except ValueError:
+                return HttpResponseBadRequest("Invalid status")
+            if new_status not in MARKABLE_STATUSES:
+                return HttpResponseBadRequest("Tasks can only be marked completed or not completed")
+            tasks = Task.objects.for_user(request.user).filter(id=pk)
+            if not stats.set_status(tasks, request.user.pk, new_status) and not tasks.exists():
                 messages.error(request, "Task not found.")
                 raise Http404("Task not found")
+            # queryset updates don't send post_save
+            invalidate_dashboard(request.user.pk)
+            task = tasks.get()
+            publish_task_event(request.user.pk, 'completed' if new_status == Task.Status.COMPLETED else 'updated',
+                               task=task)
+            messages.success(request, "Task status updated!")
+            return render(request, 'task.html', {'task': task})
         else:
             return render(request, 'task.html', {})
     else:
@@ -163,19 +237,234 @@ def mark_complete(request, pk):
 
 def delete_task(request, pk):
     if request.user.is_authenticated:
-        try:
-            task = Task.objects.get(id=pk)
-            if request.user != task.user_id:
-                messages.error(request, "Not authorized to delete this task")
-                return redirect('dashboard')
-            else:
-                task.delete()
-                messages.success(request, "Task deleted successfully!")
-        except ObjectDoesNotExist:
-            print("nottttt")
+        deleted = stats.delete_tasks(Task.objects.for_user(request.user).filter(id=pk), request.user.pk)
+        if deleted:
+            invalidate_dashboard(request.user.pk)
+            publish_task_event(request.user.pk, 'deleted', ids=[pk])
+            messages.success(request, "Task deleted successfully!")
+        else:
             messages.error(request, "Task not found.")
         return redirect('dashboard')
     else:
         messages.success(request, "You must be logged in to view this page!")
         return redirect('login')
 
+
+def schedule_recurring(request):
+    form = RecurringTaskForm(request.POST or None)
+    if request.user.is_authenticated:
+        if request.method == "POST":
+            if form.is_valid():
+                rule = form.save(commit=False)
+                rule.user = request.user
+                rule.save()
+                invalidate_dashboard(request.user.pk)
+                messages.success(request, "Recurring task scheduled")
+                return redirect('dashboard')
+        return render(request, 'schedule_recurring.html', {'form': form})
+    else:
+        messages.success(request, "You must be logged in to view this page!")
+        return redirect('login')
+
+
+def get_occurrence(user, pk, timestamp):
+    """The rule and due date of the occurrence a URL names; Http404 unless it is one of the user's."""
+    rule = get_object_or_404(RecurringTask, pk=pk, user=user)
+    try:
+        due = datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        raise Http404("Occurrence not found")
+    if not is_occurrence(rule, due):
+        raise Http404("Occurrence not found")
+    return rule, due
+
+
+def complete_occurrence(request, pk, timestamp):
+    if request.user.is_authenticated:
+        if request.method != "POST":
+            return redirect('dashboard')
+        rule, due = get_occurrence(request.user, pk, timestamp)
+        task, _ = materialize(rule, due, Task.Status.COMPLETED)
+        invalidate_dashboard(request.user.pk)
+        publish_task_event(request.user.pk, 'completed', task=task)
+        messages.success(request, "Task status updated!")
+        return redirect('dashboard')
+    else:
+        messages.success(request, "You must be logged in to view this page!")
+        return redirect('login')
+
+
+def edit_occurrence(request, pk, timestamp):
+    if request.user.is_authenticated:
+        if request.method != "POST":
+            return redirect('dashboard')
+        rule, due = get_occurrence(request.user, pk, timestamp)
+        # the occurrence gets its own row, which the usual update page then edits
+        task, created = materialize(rule, due)
+        if created:
+            publish_task_event(request.user.pk, 'created', task=task)
+        return redirect('update_task', pk=task.pk)
+    else:
+        messages.success(request, "You must be logged in to view this page!")
+        return redirect('login')
+
+
+def delete_recurring(request, pk):
+    if request.user.is_authenticated:
+        if request.method != "POST":
+            return redirect('dashboard')
+        # occurrences that already have a row are kept, as ordinary tasks
+        get_object_or_404(RecurringTask, pk=pk, user=request.user).delete()
+        invalidate_dashboard(request.user.pk)
+        messages.success(request, "Recurring task stopped.")
+        return redirect('dashboard')
+    else:
+        messages.success(request, "You must be logged in to view this page!")
+        return redirect('login')
+
+
+BULK_ACTIONS = {
+    'complete': Task.Status.COMPLETED,
+    'reopen': Task.Status.NOT_COMPLETED,
+    'delete': None,
+}
+
+BULK_EVENTS = {
+    'complete': 'completed',
+    'reopen': 'updated',
+    'delete': 'deleted',
+}
+
+
+def bulk_tasks(request):
+    if request.user.is_authenticated:
+        if request.method != "POST":
+            return redirect('dashboard')
+        action = request.POST.get('action')
+        try:
+            task_ids = {int(task_id) for task_id in request.POST.getlist('task_ids')}
+        except ValueError:
+            return HttpResponseBadRequest("Invalid task id")
+        # every id is a query parameter, and SQLite limits how many one statement may have
+        max_tasks = getattr(settings, 'BULK_MAX_TASKS', 500)
+        if len(task_ids) > max_tasks:
+            return HttpResponseBadRequest(f"Select at most {max_tasks} tasks")
+        if action not in BULK_ACTIONS or not task_ids:
+            messages.error(request, "Select at least one task and an action.")
+            return redirect('dashboard')
+
+        tasks = Task.objects.for_user(request.user).filter(id__in=task_ids)
+        if action == 'delete':
+            affected = sum(stats.delete_tasks(tasks, request.user.pk).values())
+        else:
+            affected = sum(stats.set_status(tasks, request.user.pk, BULK_ACTIONS[action]).values())
+        if affected:
+            invalidate_dashboard(request.user.pk)
+            # the requested ids; ones the user doesn't own are unknown to their clients anyway
+            publish_task_event(request.user.pk, BULK_EVENTS[action], ids=task_ids)
+
+        if request.headers.get('Accept') == 'application/json':
+            return JsonResponse({'action': action, 'affected': affected})
+        messages.success(request, f"{affected} task(s) updated." if action != 'delete'
+                         else f"{affected} task(s) deleted.")
+        return redirect('dashboard')
+    else:
+        messages.success(request, "You must be logged in to view this page!")
+        return redirect('login')
+
+
+def archived_tasks(request):
+    if request.user.is_authenticated:
+        try:
+            page = paginate(ArchivedTask.objects.filter(user_id=request.user),
+                            after=request.GET.get('after'),
+                            before=request.GET.get('before'),
+                            page_size=request.GET.get('page_size'))
+        except InvalidCursor:
+            return redirect('archived_tasks')
+        return render(request, 'archived.html', {'tasks': page.items, 'page': page})
+    else:
+        messages.success(request, "You must be logged in to view this page!")
+        return redirect('login')
+
+
+def task_events(request):
+    # Live events are served under ASGI only, by async_views.task_events: a WSGI
+    # worker would be held for the whole stream and send nothing until it ended.
+    # 204 tells EventSource not to reconnect.
+    return HttpResponse(status=204)
+
+
+def sync_tasks(request):
+    if request.user.is_authenticated:
+        try:
+            payload = changes_since(request.user, token=request.GET.get('since'))
+        except InvalidSyncToken:
+            return JsonResponse({'error': "Invalid sync token"}, status=400)
+        except SyncTokenExpired:
+            return JsonResponse({'error': "Sync token expired; sync again without one"}, status=410)
+        return JsonResponse(payload)
+    else:
+        messages.success(request, "You must be logged in to view this page!")
+        return redirect('login')
+
+
+def search_tasks(request):
+    if request.user.is_authenticated:
+        query = request.GET.get('q', '').strip()
+        tasks = run_search(request.user, query) if query else []
+        return render(request, 'search.html', {'query': query, 'tasks': tasks})
+    else:
+        messages.success(request, "You must be logged in to view this page!")
+        return redirect('login')
+
+
+def export_tasks(request):
+    if request.user.is_authenticated:
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return HttpResponseBadRequest("Unsupported export format")
+        try:
+            tasks = filter_tasks(Task.objects.for_user(request.user), request.GET)
+        except ValueError as exc:
+            return HttpResponseBadRequest(str(exc))
+        content_type, extension = EXPORT_FORMATS[export_format]
+        rows = stream_csv(tasks) if export_format == 'csv' else stream_ndjson(tasks)
+        response = StreamingHttpResponse(rows, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="tasks.{extension}"'
+        return response
+    else:
+        messages.success(request, "You must be logged in to view this page!")
+        return redirect('login')
+
+
+def import_tasks(request):
+    if request.user.is_authenticated:
+        form = ImportTasksForm(request.POST or None, request.FILES or None)
+        result = None
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data['file']
+            import_format = form.cleaned_data['format'] or guess_format(upload.name)
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_task_rows(request.user, read_rows(stream, import_format))
+            except (UnicodeDecodeError, csv.Error):
+                messages.error(request, "The file could not be read. Upload a UTF-8 CSV or NDJSON file.")
+            else:
+                messages.success(request, f"Imported {result.created} task(s).")
+        return render(request, 'import_tasks.html', {'form': form, 'result': result})
+    else:
+        messages.success(request, "You must be logged in to view this page!")
+        return redirect('login')
+
+
+@staff_member_required
+def cache_stats(request):
+    return JsonResponse({'dashboard': dashboard_cache_stats()})
+
+
+def metrics(request):
+    # Checked in this order so scrapes from allowed addresses don't touch the session
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
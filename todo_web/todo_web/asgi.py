@@ -3,6 +3,14 @@ ASGI config for todo_web project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this module (e.g. ``uvicorn todo_web.asgi:application``)
+for the live ``/events/`` stream: under ASGI each open stream is a coroutine
+waiting on a queue, whereas a WSGI server ties up a worker thread per client.
+It also serves the dashboard, login/signup and task views from
+todo_app/async_views.py (URLconf todo_web.asgi_urls), which keep the event
+loop free while they wait on the database and hash passwords on a small
+dedicated pool (AUTH_POOL_SIZE threads).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -12,5 +20,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_web.settings')
+os.environ.setdefault('TODO_ROOT_URLCONF', 'todo_web.asgi_urls')
 
 application = get_asgi_application()
@@ -0,0 +1,12 @@
+"""
+URL configuration for todo_web served through ASGI (todo_web/asgi.py).
+
+The same URLs as todo_web/urls.py, with the task views' async versions.
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('', include('todo_app.async_urls')),
+]
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,20 +42,24 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its timings include every other middleware
+    'todo_app.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'todo_app.routers.ReplicaRoutingMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'todo_web.urls'
+# todo_web/asgi.py switches to todo_web.asgi_urls, which serves the async views.
+ROOT_URLCONF = os.environ.get('TODO_ROOT_URLCONF', 'todo_web.urls')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'todo_app.metrics.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,9 +83,88 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests; 0 reconnects every request.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Optional read replica, e.g. a second SQLite file kept up to date with
+# `manage.py sync_replica --interval 5`. See todo_app.routers.
+if os.environ.get('TODO_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['TODO_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['todo_app.routers.PrimaryReplicaRouter']
+
+# How long a client keeps reading from the primary after a write (a signed
+# cookie, see todo_app.routers); keep this above the replication lag.
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+
+# Applied to every new SQLite connection by todo_app.db.configure_sqlite.
+# https://www.sqlite.org/pragma.html
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    # negative values are in KiB
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'todo-app',
+    }
+}
+
+DASHBOARD_CACHE_TIMEOUT = 300
+
+
+# Sessions, messages and authentication
+# https://docs.djangoproject.com/en/4.2/topics/http/sessions/#configuring-the-session-engine
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+# cached_db reads sessions from the cache and writes through to the database;
+# signed_cookies keeps them entirely client-side (no server-side logout).
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('TODO_SESSION_BACKEND', 'cached_db')]
+
+# Flash messages travel in a cookie instead of being written to the session.
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+AUTHENTICATION_BACKENDS = [
+    'todo_app.backends.CachedModelBackend',
+    # still resolves sessions created before the cached backend was enabled
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Login throttling (todo_app.throttling): failed logins allowed per username
+# and per client IP in a sliding window, and how long a username or IP that
+# goes over is locked out. Throttled logins are rejected before any hashing.
+LOGIN_FAILURE_WINDOW_SECONDS = int(os.environ.get('LOGIN_FAILURE_WINDOW_SECONDS', 300))
+LOGIN_FAILURES_PER_USERNAME = int(os.environ.get('LOGIN_FAILURES_PER_USERNAME', 5))
+LOGIN_FAILURES_PER_IP = int(os.environ.get('LOGIN_FAILURES_PER_IP', 50))
+LOGIN_LOCKOUT_SECONDS = int(os.environ.get('LOGIN_LOCKOUT_SECONDS', 900))
+
+# Threads the async login/signup views hash passwords on (todo_app.auth_pool);
+# a login storm queues for these instead of starving the other requests.
+AUTH_POOL_SIZE = int(os.environ.get('TODO_AUTH_POOL_SIZE', 2))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -122,3 +206,81 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Dashboard pagination
+
+TASKS_PAGE_SIZE = 25
+
+TASKS_MAX_PAGE_SIZE = 100
+
+# Most tasks one bulk action may select; the dashboard selects from one page
+BULK_MAX_TASKS = 500
+
+# Rows fetched per database round-trip when streaming task exports
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Rows written per bulk_create transaction when importing tasks
+
+IMPORT_BATCH_SIZE = 500
+
+# Delta sync (todo_app.sync): tasks per response, how far tokens lag the clock
+# (keep above the replica lag) and how long deletions are remembered
+
+SYNC_PAGE_SIZE = 500
+
+SYNC_GRACE_SECONDS = 10
+
+SYNC_TOMBSTONE_DAYS = 30
+
+# Live task events (todo_app.events), served at /events/ under ASGI. The
+# in-process broker only reaches streams of the same process, so events
+# published by run_scheduler need a broker shared with the web workers.
+
+TASK_EVENTS_BROKER = os.environ.get('TASK_EVENTS_BROKER', 'todo_app.events.InProcessBroker')
+
+SSE_KEEPALIVE_SECONDS = 15
+
+SSE_MAX_STREAM_SECONDS = 300
+
+SSE_QUEUE_SIZE = 100
+
+# Days of recurring task occurrences (todo_app.recurrence) listed on the dashboard
+
+RECURRING_WINDOW_DAYS = 14
+
+# Tasks moved per transaction by manage.py archive_tasks
+
+ARCHIVE_BATCH_SIZE = 1000
+
+# Overdue sweeper (manage.py run_scheduler)
+
+SCHEDULER_WINDOW = 10000
+
+SCHEDULER_BATCH_SIZE = 500
+
+SCHEDULER_MAX_SLEEP = 60
+
+# Email (reminders). Override EMAIL_BACKEND with the SMTP backend in production.
+# https://docs.djangoproject.com/en/4.2/topics/email/
+
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'reminders@todo.local')
+
+REMINDER_BATCH_SIZE = 200
+
+REMINDER_POLL_INTERVAL = 30
+
+# Full-text task search
+
+SEARCH_RESULTS_LIMIT = 50
+
+# Request metrics, exposed in the Prometheus text format at /metrics
+
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+
+# Log requests slower than this many milliseconds, with their SQL, to the
+# todo_app.slow_requests logger. Unset disables the log.
+SLOW_REQUEST_THRESHOLD_MS = (float(os.environ['SLOW_REQUEST_THRESHOLD_MS'])
+                             if os.environ.get('SLOW_REQUEST_THRESHOLD_MS') else None)